@@ -0,0 +1,150 @@
+# python bench_strict.py [--json out.json] [--baseline prev.json]
+"""
+Микробенчмарки @strict для обеих реализаций.
+
+Замеряет накладные расходы на вызов относительно недекорированной
+функции по числу аргументов, способу передачи (позиционно / по имени),
+успешному и ошибочному пути, а также время декорирования. Результаты
+можно сохранить в JSON и сравнить с прошлым прогоном: при замедлении
+любого случая сильнее порога скрипт завершается с кодом 1.
+"""
+import argparse
+import importlib.util
+import json
+import platform
+import sys
+import timeit
+from pathlib import Path
+from typing import Any
+
+BASE_DIR = Path(__file__).resolve().parent
+VARIANTS = ("with_inspect", "without_inspect")
+ARG_COUNTS = (1, 3, 8)
+PASSING = ("positional", "keyword")
+PATHS = ("success", "failure")
+DEFAULT_THRESHOLD = 1.2
+
+
+def load_solution(variant: str):
+    """Загружает solution.py указанной реализации."""
+    spec = importlib.util.spec_from_file_location(
+        f"strict_{variant}", BASE_DIR / variant / "solution.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_function(arg_count: int):
+    """Создаёт функцию с arg_count аргументами типа int."""
+    params = ", ".join(f"a{i}: int" for i in range(arg_count))
+    namespace: dict[str, Any] = {}
+    exec(f"def func({params}) -> int:\n    return a0", namespace)
+    return namespace["func"]
+
+
+def call_statement(arg_count: int, passing: str, path: str) -> str:
+    """Строка вызова func для timeit; при path=failure последний аргумент — str."""
+    values = [str(i) for i in range(arg_count)]
+    if path == "failure":
+        values[-1] = "'x'"
+    if passing == "keyword":
+        values = [f"a{i}={value}" for i, value in enumerate(values)]
+    call = f"func({', '.join(values)})"
+    return f"try:\n    {call}\nexcept TypeError:\n    pass"
+
+
+def best_ns(stmt: str, namespace: dict[str, Any], number: int, repeat: int):
+    """Лучшее из repeat время выполнения stmt в наносекундах."""
+    timer = timeit.Timer(stmt, globals=namespace)
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+
+def run(number: int, repeat: int) -> dict[str, Any]:
+    cases: dict[str, dict[str, float]] = {}
+    decoration: dict[str, float] = {}
+    for variant in VARIANTS:
+        solution = load_solution(variant)
+        solution.set_mode(solution.ALWAYS)
+        for arg_count in ARG_COUNTS:
+            bare = make_function(arg_count)
+            for codegen in (True, False):
+                wrapped = solution.strict(codegen=codegen)(bare)
+                mode = "codegen" if codegen else "interpreted"
+                decoration[f"{variant}/{mode}/{arg_count}"] = best_ns(
+                    "strict(codegen=codegen)(func)",
+                    {
+                        "strict": solution.strict,
+                        "codegen": codegen,
+                        "func": bare,
+                    },
+                    max(number // 100, 10),
+                    repeat,
+                )
+                for passing in PASSING:
+                    baseline = best_ns(
+                        call_statement(arg_count, passing, "success"),
+                        {"func": bare},
+                        number,
+                        repeat,
+                    )
+                    for path in PATHS:
+                        stmt = call_statement(arg_count, passing, path)
+                        ns = best_ns(stmt, {"func": wrapped}, number, repeat)
+                        key = f"{variant}/{mode}/{arg_count}/{passing}/{path}"
+                        cases[key] = {
+                            "ns_per_call": round(ns, 1),
+                            "overhead_ns": round(ns - baseline, 1),
+                        }
+                        print(f"{key:<52}{ns:9.1f} ns  (+{ns - baseline:.1f})")
+    return {
+        "python": platform.python_version(),
+        "number": number,
+        "cases": cases,
+        "decoration_ns": {k: round(v, 1) for k, v in decoration.items()},
+    }
+
+
+def find_regressions(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    """Случаи, время вызова которых выросло больше чем в threshold раз."""
+    regressions = []
+    for key, result in current["cases"].items():
+        previous = baseline.get("cases", {}).get(key)
+        if previous is None:
+            continue
+        ratio = result["ns_per_call"] / previous["ns_per_call"]
+        if ratio > threshold:
+            regressions.append(
+                f"{key}: {previous['ns_per_call']} -> "
+                f"{result['ns_per_call']} ns (x{ratio:.2f})"
+            )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--json", type=Path, help="куда сохранить результаты")
+    parser.add_argument("--baseline", type=Path, help="прошлые результаты")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--number", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.number, args.repeat)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = find_regressions(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,844 @@
-from functools import wraps
-from typing import Any, Callable, TypeVar, get_type_hints
+import asyncio
+import inspect  # только markcoroutinefunction; аргументы разбираются без него
+import os
+from collections import OrderedDict, abc
+from functools import partial, wraps
+from itertools import chain, islice
+from types import UnionType
+from typing import (
+    Annotated,
+    Any,
+    Awaitable,
+    Callable,
+    Generator,
+    Iterable,
+    Literal,
+    Mapping,
+    NamedTuple,
+    Sequence,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+    is_typeddict,
+)
 
 RT = TypeVar("RT")
+# Проверка аргумента: кортеж классов, предикат или None (любое значение).
+Check = tuple[type, ...] | Callable[[Any], bool] | None
 
+# Флаги объекта кода: функция принимает *args / **kwargs,
+# является генератором, корутиной или асинхронным генератором.
+CO_VARARGS = 0x04
+CO_VARKEYWORDS = 0x08
+CO_GENERATOR = 0x20
+CO_COROUTINE = 0x80
+CO_ASYNC_GENERATOR = 0x200
 
-def strict(func: Callable[..., RT]) -> Callable[..., RT]:
-    if not func.__annotations__:
-        raise TypeError("Function must have type annotations")
+# Режимы проверки: always — каждый вызов, sampled — каждый N-й вызов
+# функции, off — без проверок. Начальный режим задаётся переменными
+# окружения STRICT_MODE и STRICT_SAMPLE_RATE.
+ALWAYS = "always"
+SAMPLED = "sampled"
+OFF = "off"
+STRICT_MODE_ENV = "STRICT_MODE"
+STRICT_SAMPLE_RATE_ENV = "STRICT_SAMPLE_RATE"
+DEFAULT_SAMPLE_RATE = 100
+# Сколько элементов коллекции проверять для аннотаций вида list[int].
+DEFAULT_MAX_ITEMS = 100
+
+# Виды функций, для которых по-разному проверяется результат.
+FUNCTION = "function"
+COROUTINE = "coroutine"
+GENERATOR = "generator"
+ASYNC_GENERATOR = "async_generator"
+# Каждое какое значение генератора проверять при check_return=True.
+DEFAULT_YIELD_EVERY = 100
+
+
+class _Config:
+    """Общие для процесса настройки режима проверки."""
+
+    __slots__ = ("mode", "sample_rate")
+
+    def __init__(self) -> None:
+        self.mode = ALWAYS
+        self.sample_rate = DEFAULT_SAMPLE_RATE
+
+
+_config = _Config()
+
+
+def set_mode(mode: str, sample_rate: int | None = None) -> None:
+    """
+    Переключает режим проверки для всех функций процесса.
+
+    Режим off при декорировании возвращает исходную функцию, уже
+    созданные обёртки в режиме off сразу вызывают функцию.
+    """
+    # Храним константу модуля: обёртки сравнивают режим через is.
+    modes = {m: m for m in (ALWAYS, SAMPLED, OFF)}
+    if mode not in modes:
+        raise ValueError(f"Unknown strict mode: {mode!r}")
+    if sample_rate is not None:
+        if sample_rate < 1:
+            raise ValueError("sample_rate must be >= 1")
+        _config.sample_rate = sample_rate
+    _config.mode = modes[mode]
+
+
+def get_mode() -> str:
+    return _config.mode
+
+
+set_mode(
+    os.environ.get(STRICT_MODE_ENV, ALWAYS),
+    int(os.environ.get(STRICT_SAMPLE_RATE_ENV, DEFAULT_SAMPLE_RATE)),
+)
+
+
+class CallStats(NamedTuple):
+    checked: int
+    skipped: int
+
+
+class _CallStats:
+    """
+    Счётчики проверенных и пропущенных вызовов одной функции.
+
+    countdown — сколько вызовов осталось пропустить до следующей
+    проверки в режиме sampled.
+    """
+
+    __slots__ = ("checked", "skipped", "countdown")
+
+    def __init__(self) -> None:
+        self.checked = 0
+        self.skipped = 0
+        self.countdown = 0
+
+    def info(self) -> CallStats:
+        return CallStats(self.checked, self.skipped)
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class _TypeCache:
+    """
+    Ограниченный LRU-кэш кортежей типов аргументов, уже прошедших проверку.
+
+    Для аннотаций-классов результат isinstance определяется типом значения,
+    поэтому повторный вызов с теми же типами проверять не нужно.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._keys: OrderedDict[tuple, None] = OrderedDict()
+
+    @staticmethod
+    def make_key(args: tuple, kwargs: dict[str, Any]) -> tuple:
+        key = tuple(map(type, args))
+        if kwargs:
+            key += tuple(sorted((k, type(v)) for k, v in kwargs.items()))
+        return key
+
+    def hit(self, key: tuple) -> bool:
+        try:
+            self._keys.move_to_end(key)
+        except KeyError:
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def add(self, key: tuple) -> None:
+        self._keys[key] = None
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._keys))
+
+    def clear(self) -> None:
+        self.hits = self.misses = 0
+        self._keys.clear()
+
+
+def _type_name(annotation: Any) -> str:
+    if isinstance(annotation, type):
+        return annotation.__name__
+    return repr(annotation).replace("typing.", "")
+
+
+def _value_error(subject: str, expected: Any, value: Any) -> TypeError:
+    return TypeError(
+        f"{subject} must be {_type_name(expected)}, not {type(value).__name__}"
+    )
+
+
+def _argument_error(name: str, expected: Any, value: Any) -> TypeError:
+    return _value_error(f"Argument '{name}'", expected, value)
+
+
+def _as_predicate(check: Check) -> Callable[[Any], bool]:
+    if check is None:
+        return lambda value: True
+    if isinstance(check, tuple):
+        return lambda value: isinstance(value, check)
+    return check
+
+
+def _matches(check: Check, value: Any) -> bool:
+    if check is None:
+        return True
+    if type(check) is tuple:
+        return isinstance(value, check)
+    return check(value)
+
+
+def _compile_union(args: tuple, max_items: int | None) -> Check:
+    checks = [_compile_check(arg, max_items) for arg in args]
+    if any(check is None for check in checks):
+        return None
+    if all(isinstance(check, tuple) for check in checks):
+        return tuple(chain.from_iterable(checks))  # type: ignore[arg-type]
+    predicates = [_as_predicate(check) for check in checks]
+    return lambda value: any(predicate(value) for predicate in predicates)
+
+
+def _compile_literal(args: tuple) -> Check:
+    # Тип входит в ключ, чтобы Literal[1] не принимал True.
+    allowed = {(type(arg), arg) for arg in args}
+
+    def check(value: Any) -> bool:
+        try:
+            return (type(value), value) in allowed
+        except TypeError:  # нехешируемое значение
+            return False
+
+    return check
+
+
+def _compile_typeddict(annotation: Any, max_items: int | None) -> Check:
+    fields = {
+        key: _as_predicate(_compile_check(hint, max_items))
+        for key, hint in get_type_hints(annotation).items()
+    }
+    required = annotation.__required_keys__
+
+    def check(value: Any) -> bool:
+        return (
+            isinstance(value, dict)
+            and required <= value.keys()
+            and all(fields[k](v) for k, v in value.items() if k in fields)
+        )
+
+    return check
+
+
+def _compile_container(
+    origin: type, args: tuple, max_items: int | None
+) -> Check:
+    if issubclass(origin, abc.Mapping) and len(args) == 2:
+        key_check, value_check = (_compile_check(a, max_items) for a in args)
+        if key_check is None and value_check is None:
+            return (origin,)
+        key, val = _as_predicate(key_check), _as_predicate(value_check)
+        return lambda value: isinstance(value, origin) and all(
+            key(k) and val(v) for k, v in islice(value.items(), max_items)
+        )
+
+    if origin is tuple and not (len(args) == 2 and args[1] is Ellipsis):
+        items = [_as_predicate(_compile_check(a, max_items)) for a in args]
+        return lambda value: (
+            isinstance(value, tuple)
+            and len(value) == len(items)
+            and all(item(v) for item, v in zip(items, value))
+        )
+
+    # Элементы проверяем только у коллекций: обход итератора его расходует.
+    if len(args) in (1, 2) and issubclass(origin, abc.Collection):
+        item_check = _compile_check(args[0], max_items)
+        if item_check is None:
+            return (origin,)
+        item = _as_predicate(item_check)
+        return lambda value: isinstance(value, origin) and all(
+            map(item, islice(value, max_items))
+        )
+    return (origin,)
+
+
+def _compile_typevar(annotation: TypeVar, max_items: int | None) -> Check:
+    if annotation.__bound__ is not None:
+        return _compile_check(annotation.__bound__, max_items)
+    if annotation.__constraints__:
+        return _compile_union(annotation.__constraints__, max_items)
+    return None
+
+
+def _compile_class(annotation: Any) -> Check:
+    if isinstance(annotation, type):
+        return (annotation,)
+    raise TypeError(f"Unsupported annotation: {annotation!r}")
+
+
+def _compile_type(args: tuple, max_items: int | None) -> Check:
+    bound = _compile_check(args[0], max_items) if args else None
+    if not isinstance(bound, tuple):
+        return (type,)
+    return lambda value: isinstance(value, type) and issubclass(value, bound)
+
+
+def _compile_generic(origin: Any, args: tuple, max_items: int | None) -> Check:
+    if origin is Annotated:
+        return _compile_check(args[0], max_items)
+    if origin is Union or origin is UnionType:
+        return _compile_union(args, max_items)
+    if origin is Literal:
+        return _compile_literal(args)
+    if origin is type:
+        return _compile_type(args, max_items)
+    if origin is abc.Callable or not args:
+        return (origin,)
+    return _compile_container(origin, args, max_items)
+
+
+def _compile_check(annotation: Any, max_items: int | None) -> Check:
+    """
+    Компилирует аннотацию в проверку значения.
+
+    Возвращает кортеж классов для isinstance (результат зависит только
+    от типа значения), предикат для составных типов (list[int], Literal,
+    TypedDict, ...) или None, если подходит любое значение. У коллекций
+    проверяются первые max_items элементов (None — все).
+    """
+    if annotation is Any or annotation is object:
+        return None
+    if isinstance(annotation, TypeVar):
+        return _compile_typevar(annotation, max_items)
+    if hasattr(annotation, "__supertype__"):  # NewType
+        return _compile_check(annotation.__supertype__, max_items)
+    if is_typeddict(annotation):
+        return _compile_typeddict(annotation, max_items)
+    origin = get_origin(annotation)
+    if origin is None:
+        return _compile_class(annotation)
+    return _compile_generic(origin, get_args(annotation), max_items)
+
+
+def _positional_names(func: Callable[..., Any]) -> list[str] | None:
+    """
+    Возвращает имена параметров из объекта кода функции,
+    если все они позиционные и без значений по умолчанию.
+    """
+    code = func.__code__
+    if code.co_flags & (CO_VARARGS | CO_VARKEYWORDS):
+        return None
+    if code.co_kwonlyargcount or func.__defaults__:
+        return None
+    return list(code.co_varnames[: code.co_argcount])
+
+
+def _function_kind(func: Callable[..., Any]) -> str:
+    flags = func.__code__.co_flags
+    if flags & CO_ASYNC_GENERATOR:
+        return ASYNC_GENERATOR
+    if flags & CO_COROUTINE:
+        return COROUTINE
+    if flags & CO_GENERATOR:
+        return GENERATOR
+    return FUNCTION
+
+
+def _mark_coroutine_function(wrapper: Callable[..., Any]) -> None:
+    """
+    Помечает синхронную обёртку, возвращающую корутину, как корутинную
+    функцию, чтобы её распознавали iscoroutinefunction (и backoff).
+    """
+    mark = getattr(inspect, "markcoroutinefunction", None)  # Python 3.12+
+    if mark is not None:
+        mark(wrapper)
+    else:
+        wrapper._is_coroutine = asyncio.coroutines._is_coroutine  # type: ignore
+
+
+def _compile_checks(
+    annotations: dict[str, Any], max_items: int | None
+) -> dict[str, Check]:
+    """Проверки параметров в порядке объявления (None — любое значение)."""
+    return {
+        name: _compile_check(annotation, max_items)
+        for name, annotation in annotations.items()
+        if name != "return"
+    }
+
+
+def _emit_check(
+    lines: list[str],
+    namespace: dict[str, Any],
+    i: int,
+    var: str,
+    name: str,
+    annotation: Any,
+    check: Check,
+    indent: str = "    ",
+) -> None:
+    """
+    Добавляет в генерируемый код проверку аргумента var с отступом indent.
+
+    Для одного класса сначала сравнивается точный тип, для объединения
+    классов — по таблице точных типов, затем isinstance; составные
+    аннотации проверяются скомпилированным предикатом.
+    """
+    namespace[f"_A{i}"] = annotation
+    namespace[f"_N{i}"] = name
+    if isinstance(check, tuple) and len(check) == 1:
+        namespace[f"_T{i}"] = check[0]
+        condition = (
+            f"_type({var}) is not _T{i} and not _isinstance({var}, _T{i})"
+        )
+    elif isinstance(check, tuple):
+        namespace[f"_T{i}"] = check
+        namespace[f"_D{i}"] = frozenset(check)
+        condition = (
+            f"_type({var}) not in _D{i} and not _isinstance({var}, _T{i})"
+        )
+    else:
+        namespace[f"_C{i}"] = check
+        condition = f"not _C{i}({var})"
+    lines.append(f"{indent}if {condition}:")
+    lines.append(f"{indent}    raise _error(_N{i}, _A{i}, {var})")
+
+
+def _emit_checks(
+    lines: list[str],
+    namespace: dict[str, Any],
+    names: list[str],
+    targets: list[tuple[int, str, Any, Check]],
+    cache: _TypeCache | None,
+) -> None:
+    """
+    Добавляет проверки быстрого пути для targets (номер аргумента, имя
+    параметра, аннотация, проверка). С кэшем проверки выполняются только
+    для нового кортежа типов аргументов: ключ совпадает с ключом
+    _TypeCache.make_key для позиционного вызова, поэтому кэш общий
+    с универсальной проверкой.
+    """
+    indent = "    "
+    if cache is not None:
+        namespace.update(_cache=cache, _keys=cache._keys, _add=cache.add)
+        key = "".join(f"_type({var}), " for var in names)
+        lines += [
+            f"    key = ({key})",
+            "    if key in _keys:",
+            "        _keys.move_to_end(key)",
+            "        _cache.hits += 1",
+            "    else:",
+            "        _cache.misses += 1",
+        ]
+        indent = "        "
+    for i, name, annotation, check in targets:
+        _emit_check(
+            lines, namespace, i, names[i], name, annotation, check, indent
+        )
+    if cache is not None:
+        lines.append("        _add(key)")
+
+
+def _checked_return(
+    check: Callable[[Any], bool], annotation: Any, value: Any
+) -> Any:
+    if not check(value):
+        raise _value_error("Return value", annotation, value)
+    return value
+
+
+async def _checked_coroutine(
+    check: Callable[[Any], bool], annotation: Any, coro: Awaitable[Any]
+) -> Any:
+    value = await coro
+    if not check(value):
+        raise _value_error("Return value", annotation, value)
+    return value
+
+
+class _YieldCheck:
+    """
+    Проверка каждого every-го значения, отданного генератором gen
+    (начиная с первого); при ошибке gen закрывается.
+    """
+
+    __slots__ = ("gen", "check", "annotation", "every", "count")
+
+    def __init__(
+        self,
+        check: Callable[[Any], bool],
+        annotation: Any,
+        every: int,
+        gen: Any,
+    ) -> None:
+        self.gen = gen
+        self.check = check
+        self.annotation = annotation
+        self.every = every
+        self.count = 0
+
+    def failed(self, value: Any) -> bool:
+        due = not self.count % self.every
+        self.count += 1
+        return due and not self.check(value)
+
+
+class _CheckedYields(_YieldCheck):
+    """
+    Итератор-посредник для yield from: send, throw и close передаются
+    генератору gen, отданные им значения проверяются.
+    """
+
+    __slots__ = ()
+
+    def _checked(self, value: Any) -> Any:
+        if self.failed(value):
+            self.gen.close()
+            raise _value_error("Yielded value", self.annotation, value)
+        return value
+
+    def __iter__(self) -> "_CheckedYields":
+        return self
+
+    def __next__(self) -> Any:
+        return self._checked(next(self.gen))
+
+    def send(self, value: Any) -> Any:
+        return self._checked(self.gen.send(value))
+
+    def throw(self, *exc_info: Any) -> Any:
+        return self._checked(self.gen.throw(*exc_info))
+
+    def close(self) -> None:
+        self.gen.close()
+
+
+class _CheckedAsyncYields(_YieldCheck):
+    """Асинхронный аналог _CheckedYields (без return)."""
+
+    __slots__ = ()
+
+    async def _checked(self, step: Awaitable[Any]) -> Any:
+        value = await step
+        if self.failed(value):
+            await self.gen.aclose()
+            raise _value_error("Yielded value", self.annotation, value)
+        return value
+
+    def __aiter__(self) -> "_CheckedAsyncYields":
+        return self
+
+    def __anext__(self) -> Awaitable[Any]:
+        return self._checked(self.gen.__anext__())
+
+    def asend(self, value: Any) -> Awaitable[Any]:
+        return self._checked(self.gen.asend(value))
+
+    def athrow(self, *exc_info: Any) -> Awaitable[Any]:
+        return self._checked(self.gen.athrow(*exc_info))
+
+    def aclose(self) -> Awaitable[None]:
+        return self.gen.aclose()
+
+
+def _checked_generator(
+    yield_check: Callable[[Any], bool] | None,
+    return_check: Callable[[Any], bool] | None,
+    annotations: tuple[Any, Any],
+    every: int,
+    gen: Generator[Any, Any, Any],
+) -> Generator[Any, Any, Any]:
+    """
+    Делегирует генератору gen, проверяя каждое every-е отданное значение
+    (см. _CheckedYields) и значение return. Без проверки yield работает
+    через yield from, то есть без накладных расходов на элемент.
+    """
+    if yield_check is not None:
+        gen = _CheckedYields(yield_check, annotations[0], every, gen)
+    value = yield from gen
+    if return_check is not None and not return_check(value):
+        raise _value_error("Return value", annotations[1], value)
+    return value
+
+
+def _compile_yield_hook(
+    kind: str, annotation: Any, max_items: int | None, yield_every: int
+) -> Callable[[Any], Any] | None:
+    """Обработчик результата генератора: Generator[Y, S, R] и аналоги."""
+    origin, args = get_origin(annotation), get_args(annotation)
+    if not args:
+        return None
+    yield_check = _compile_check(args[0], max_items)
+    return_check = None
+    if origin is abc.Generator and len(args) == 3:
+        return_check = _compile_check(args[2], max_items)
+    if yield_check is None and return_check is None:
+        return None
+    if kind == ASYNC_GENERATOR:
+        return partial(
+            _CheckedAsyncYields,
+            _as_predicate(yield_check),
+            args[0],
+            yield_every,
+        )
+    return partial(
+        _checked_generator,
+        None if yield_check is None else _as_predicate(yield_check),
+        None if return_check is None else _as_predicate(return_check),
+        (args[0], args[2] if len(args) == 3 else None),
+        yield_every,
+    )
+
+
+def _compile_result_hook(
+    kind: str, annotation: Any, max_items: int | None, yield_every: int
+) -> Callable[[Any], Any] | None:
+    """
+    Возвращает обработчик результата вызова для проверки return/yield.
+
+    Для обычной функции проверяется значение, для корутины — результат
+    await (это единственный добавляемый слой await), для генераторов —
+    каждое yield_every-е значение и return (Generator[Y, S, R]).
+    None — проверять нечего.
+    """
+    if kind in (GENERATOR, ASYNC_GENERATOR):
+        return _compile_yield_hook(kind, annotation, max_items, yield_every)
+    check = _compile_check(annotation, max_items)
+    if check is None:
+        return None
+    if kind == COROUTINE:
+        return partial(_checked_coroutine, _as_predicate(check), annotation)
+    return partial(_checked_return, _as_predicate(check), annotation)
+
+
+def _compile_wrapper(
+    func: Callable[..., RT],
+    expected_arg_names: list[str],
+    expected_arg_types: dict[str, Any],
+    checks: dict[str, Check],
+    check_args: Callable[[tuple, dict[str, Any]], None],
+    stats: "_CallStats",
+    post: Callable[[Any], Any] | None,
+    cache: _TypeCache | None,
+) -> Callable[..., RT] | None:
+    """
+    Генерирует обёртку, специализированную под сигнатуру функции.
+
+    Быстрый путь — вызов ровно с позиционными аргументами: проверки
+    развёрнуты по параметрам, точное совпадение типа проверяется раньше
+    isinstance; при наличии cache проверки пропускаются для уже
+    встречавшегося кортежа типов (см. _emit_checks). Все прочие вызовы
+    (kwargs, неверное число аргументов) проверяются через check_args,
+    поэтому тексты ошибок не меняются.
+    Режим проверки (см. set_mode) читается на каждом вызове, результат
+    проверенного вызова передаётся в post (см. _compile_result_hook).
+    Возвращает None, если сигнатура не подходит для генерации.
+    """
+    if _positional_names(func) != expected_arg_names:
+        return None
+
+    namespace: dict[str, Any] = {
+        "_func": func,
+        "_check_args": check_args,
+        "_stats": stats,
+        "_config": _config,
+        "_ALWAYS": ALWAYS,
+        "_OFF": OFF,
+        "_type": type,
+        "_isinstance": isinstance,
+        "_error": _argument_error,
+        "_post": post,
+    }
+    call = "_func({})" if post is None else "_post(_func({}))"
+    names = [f"a{i}" for i in range(len(expected_arg_names))]
+    lines = [
+        "def wrapper(*args, **kwargs):",
+        "    mode = _config.mode",
+        "    if mode is not _ALWAYS:",
+        "        if mode is _OFF:",
+        "            return _func(*args, **kwargs)",
+        "        if _stats.countdown:",
+        "            _stats.countdown -= 1",
+        "            _stats.skipped += 1",
+        "            return _func(*args, **kwargs)",
+        "        _stats.countdown = _config.sample_rate - 1",
+        "    _stats.checked += 1",
+        f"    if kwargs or len(args) != {len(names)}:",
+        "        _check_args(args, kwargs)",
+        f"        return {call.format('*args, **kwargs')}",
+    ]
+    if names:
+        lines.append(f"    {', '.join(names)}, = args")
+    targets = [
+        (i, arg_name, expected_arg_types[arg_name], checks[arg_name])
+        for i, arg_name in enumerate(expected_arg_names)
+        if checks[arg_name] is not None
+    ]
+    _emit_checks(lines, namespace, names, targets, cache)
+    lines.append(f"    return {call.format(', '.join(names))}")
+
+    code = compile("\n".join(lines), f"<strict {func.__qualname__}>", "exec")
+    exec(code, namespace)
+    return namespace["wrapper"]
+
+
+def _cached_check_args(
+    check_args: Callable[[tuple, dict[str, Any]], None], cache: _TypeCache
+) -> Callable[[tuple, dict[str, Any]], None]:
+    """Пропускает проверку, если кортеж типов аргументов уже в кэше."""
+
+    def cached(args: tuple, kwargs: dict[str, Any]) -> None:
+        key = cache.make_key(args, kwargs)
+        if not cache.hit(key):
+            check_args(args, kwargs)
+            cache.add(key)
+
+    return cached
+
+
+def _make_wrapper(
+    func: Callable[..., RT],
+    check_args: Callable[[tuple, dict[str, Any]], None],
+    stats: _CallStats,
+    post: Callable[[Any], Any] | None,
+) -> Callable[..., RT]:
+    """Обёртка без кодогенерации; режим проверки читается на каждом вызове."""
 
     @wraps(func)
     def wrapper(*args: Any, **kwargs: Any) -> RT:
-        annotations = get_type_hints(func)
-        # annotations = func.__annotations__
-        expected_arg_names = [k for k in annotations if k != "return"]
-        expected_arg_types = {
-            name: annotations[name] for name in expected_arg_names
-        }
+        mode = _config.mode
+        if mode is not ALWAYS:
+            if mode is OFF:
+                return func(*args, **kwargs)
+            if stats.countdown:
+                stats.countdown -= 1
+                stats.skipped += 1
+                return func(*args, **kwargs)
+            stats.countdown = _config.sample_rate - 1
+        stats.checked += 1
+        check_args(args, kwargs)
+        if post is None:
+            return func(*args, **kwargs)
+        return post(func(*args, **kwargs))
+
+    return wrapper
+
+
+def _return_hook(
+    func: Callable[..., Any],
+    annotations: dict[str, Any],
+    check_return: bool,
+    max_items: int | None,
+    yield_every: int,
+) -> Callable[[Any], Any] | None:
+    """Обработчик результата при check_return (см. _compile_result_hook)."""
+    if not check_return or "return" not in annotations:
+        return None
+    if yield_every < 1:
+        raise ValueError("yield_every must be >= 1")
+    return _compile_result_hook(
+        _function_kind(func), annotations["return"], max_items, yield_every
+    )
+
+
+def _expose(
+    result: Callable[..., RT],
+    func: Callable[..., RT],
+    params: tuple[tuple[str, Check], ...],
+    stats: _CallStats,
+    cache: _TypeCache | None,
+) -> Callable[..., RT]:
+    """Добавляет обёртке служебные атрибуты strict."""
+    result.__strict_params__ = params  # type: ignore[attr-defined]
+    result.strict_stats = stats.info  # type: ignore[attr-defined]
+    if _function_kind(func) == COROUTINE:
+        _mark_coroutine_function(result)
+    if cache is not None:
+        result.cache_info = cache.info  # type: ignore[attr-defined]
+        result.cache_clear = cache.clear  # type: ignore[attr-defined]
+    return result
+
+
+def strict(
+    func: Callable[..., RT] | None = None,
+    *,
+    codegen: bool = True,
+    cache_size: int = 128,
+    max_items: int | None = DEFAULT_MAX_ITEMS,
+    check_return: bool = False,
+    yield_every: int = DEFAULT_YIELD_EVERY,
+) -> Callable[..., RT]:
+    """
+    Проверяет типы аргументов по аннотациям функции.
+
+    Аннотации разрешаются один раз при декорировании.
+    При codegen=True для сигнатуры генерируется специализированная
+    обёртка (см. _compile_wrapper), при codegen=False — используется
+    универсальная проверка аргументов.
+
+    Обе обёртки (и быстрый путь codegen) кэшируют кортежи типов успешно
+    проверенных вызовов (LRU на cache_size записей, 0 — без кэша): при совпадении
+    типов проверки isinstance пропускаются. Счётчики попаданий доступны
+    через cache_info(), сброс — cache_clear(). Кэш доступен, только если
+    все проверки зависят лишь от типа значения (классы и их объединения).
+
+    Составные аннотации (list[int], int | None, Literal, TypedDict, ...)
+    компилируются в проверки при декорировании (см. _compile_check);
+    у коллекций проверяются первые max_items элементов (None — все).
+
+    Режим проверки общий для процесса (set_mode, STRICT_MODE): в режиме
+    sampled проверяется каждый N-й вызов функции, число проверенных и
+    пропущенных вызовов возвращает strict_stats().
 
+    Корутины и генераторы возвращаются без дополнительной обёртки,
+    аргументы проверяются при вызове. При check_return=True проверяется
+    и результат: значение функции, результат await корутины, каждое
+    yield_every-е значение генератора и его return.
+    """
+    if func is None:
+        return partial(  # type: ignore
+            strict,
+            codegen=codegen,
+            cache_size=cache_size,
+            max_items=max_items,
+            check_return=check_return,
+            yield_every=yield_every,
+        )
+    if not func.__annotations__:
+        raise TypeError("Function must have type annotations")
+    if _config.mode is OFF:
+        return func
+
+    annotations = get_type_hints(func)
+    expected_arg_names = [k for k in annotations if k != "return"]
+    expected_arg_types = {
+        name: annotations[name] for name in expected_arg_names
+    }
+
+    checks = _compile_checks(annotations, max_items)
+
+    cacheable = all(
+        check is None or isinstance(check, tuple) for check in checks.values()
+    )
+    cache = _TypeCache(cache_size) if cache_size > 0 and cacheable else None
+    stats = _CallStats()
+    post = _return_hook(func, annotations, check_return, max_items, yield_every)
+
+    def check_args(args: tuple, kwargs: dict[str, Any]) -> None:
         provided_args = list(args)
         provided_kwargs = kwargs.keys()
 
@@ -45,23 +867,108 @@ def strict(func: Callable[..., RT]) -> Callable[..., RT]:
             )
 
         for arg, name in zip(provided_args, expected_arg_names):
-            if name in expected_arg_types and not isinstance(
-                arg, expected_arg_types[name]
-            ):
-                raise TypeError(
-                    f"Argument '{name}' must be "
-                    f"{expected_arg_types[name].__name__}, not {type(arg).__name__}"
-                )
+            if not _matches(checks[name], arg):
+                raise _argument_error(name, expected_arg_types[name], arg)
 
         for name, value in kwargs.items():
             if name not in expected_arg_types:
                 raise TypeError(f"Unexpected keyword argument '{name}'")
-            if not isinstance(value, expected_arg_types[name]):
-                raise TypeError(
-                    f"Argument '{name}' must be "
-                    f"{expected_arg_types[name].__name__}, not {type(value).__name__}"
-                )
+            if not _matches(checks[name], value):
+                raise _argument_error(name, expected_arg_types[name], value)
 
-        return func(*args, **kwargs)
+    if cache is not None:
+        check_args = _cached_check_args(check_args, cache)
 
-    return wrapper
+    compiled = None
+    if codegen:
+        compiled = _compile_wrapper(
+            func,
+            expected_arg_names,
+            expected_arg_types,
+            checks,
+            check_args,
+            stats,
+            post,
+            cache,
+        )
+    if compiled is None:
+        result = _make_wrapper(func, check_args, stats, post)
+    else:
+        result = wraps(func)(compiled)
+    return _expose(result, func, tuple(checks.items()), stats, cache)
+
+
+def _validation_params(
+    func: Callable[..., Any],
+) -> tuple[tuple[str, Check], ...]:
+    params = getattr(func, "__strict_params__", None)
+    if params is None:
+        checks = _compile_checks(get_type_hints(func), DEFAULT_MAX_ITEMS)
+        params = tuple(checks.items())
+    return params
+
+
+def _columns(
+    params: tuple[tuple[str, Check], ...],
+    rows: Iterable[Sequence[Any]] | Mapping[str, Sequence[Any]],
+) -> tuple[list[Sequence[Any]], int | None]:
+    """
+    Колонки значений по параметрам и индекс первой строки с неверным
+    числом аргументов (строки после неё в колонки не попадают).
+    """
+    if isinstance(rows, Mapping):
+        missing_args = [name for name, _ in params if name not in rows]
+        if missing_args:
+            raise TypeError(f"Missing required arguments: {missing_args}")
+        columns = [rows[name] for name, _ in params]
+        if len(set(map(len, columns))) > 1:
+            raise ValueError("Columns must have equal length")
+        return columns, None
+    rows = list(rows)
+    first_bad = next(
+        (i for i, row in enumerate(rows) if len(row) != len(params)), None
+    )
+    return list(zip(*rows[:first_bad])) or [()] * len(params), first_bad
+
+
+def _first_mismatch(check: Check, column: Sequence[Any]) -> int | None:
+    """Индекс первого значения колонки, не прошедшего проверку."""
+    if check is None:
+        return None
+    if not isinstance(check, tuple):
+        return next(
+            (i for i, value in enumerate(column) if not check(value)), None
+        )
+    bad_types = {
+        tp for tp in set(map(type, column)) if not issubclass(tp, check)
+    }
+    if not bad_types:
+        return None
+    return next(i for i, value in enumerate(column) if type(value) in bad_types)
+
+
+def validate_many(
+    func: Callable[..., Any],
+    rows: Iterable[Sequence[Any]] | Mapping[str, Sequence[Any]],
+) -> int | None:
+    """
+    Проверяет пакет аргументов по аннотациям функции за один проход.
+
+    rows — итерируемое кортежей позиционных аргументов либо словарь
+    колонок {имя параметра: значения}. Типы каждой колонки проверяются
+    оптом: isinstance вычисляется один раз на каждый встреченный тип,
+    составные аннотации проверяются поэлементно.
+    Возвращает индекс первой строки с ошибкой или None, если пакет
+    корректен. Проверенный пакет можно обрабатывать без повторных
+    проверок через func.__wrapped__.
+    """
+    params = _validation_params(func)
+    columns, first_bad = _columns(params, rows)
+    for (_, check), column in zip(params, columns):
+        index = _first_mismatch(check, column)
+        if index is not None and (first_bad is None or index < first_bad):
+            first_bad = index
+    return first_bad
+
+
+strict.validate_many = validate_many  # type: ignore[attr-defined]
@@ -1,7 +1,18 @@
 # pytest tests_exercise_1.py -v
+import asyncio
+import inspect
 import re
+from typing import (
+    Any,
+    AsyncIterator,
+    Generator,
+    Literal,
+    Optional,
+    TypedDict,
+)
 
 import pytest
+import solution
 from solution import strict
 
 
@@ -77,3 +88,304 @@ def test_no_annotations():
         @strict
         def no_annotations(a, b):
             return a + b
+
+
+@strict(codegen=False)
+def sum_two_interpreted(a: int, b: int) -> int:
+    return a + b
+
+
+def test_codegen_and_interpreted_messages():
+    "Проверяет совпадение ошибок быстрого и универсального пути."
+    for func in (sum_two, sum_two_interpreted):
+        assert func(1, 2) == 3
+        assert func(1, b=2) == 3
+        with pytest.raises(
+            TypeError, match="Argument 'b' must be int, not float"
+        ):
+            func(1, 2.4)
+        with pytest.raises(TypeError, match="Expected 2 arguments, got 3"):
+            func(1, 2, 3)
+
+
+def test_codegen_subclass():
+    "Проверяет isinstance-семантику быстрого пути."
+
+    @strict
+    def scale(value: float, flag: int) -> float:
+        return value * flag
+
+    assert scale(1.5, True) == 1.5  # bool — подкласс int
+    assert scale.__wrapped__(2.0, 2) == 4.0
+    with pytest.raises(TypeError, match="Argument 'flag' must be int, not str"):
+        scale(1.5, "2")
+
+
+def test_type_cache_hits():
+    "Проверяет кэш кортежей типов и его счётчики."
+
+    @strict(codegen=False, cache_size=2)
+    def concat(a: str, b: int) -> str:
+        return a * b
+
+    assert concat("x", 2) == "xx"
+    assert concat("y", 3) == "yyy"
+    assert concat(a="z", b=1) == "z"
+    assert concat(b=1, a="z") == "z"  # порядок kwargs не важен
+    assert concat.cache_info() == (2, 2, 2, 2)
+
+    with pytest.raises(TypeError, match="Argument 'b' must be int, not str"):
+        concat("x", "2")  # ошибка не попадает в кэш
+    info = concat.cache_info()
+    assert (info.misses, info.currsize) == (3, 2)
+
+    concat.cache_clear()
+    assert concat.cache_info() == (0, 0, 2, 0)
+
+
+def test_type_cache_codegen_fast_path():
+    "Проверяет, что позиционные вызовы быстрого пути идут через кэш."
+
+    @strict
+    def concat(a: str, b: int) -> str:
+        return a * b
+
+    assert concat("x", 2) == "xx"
+    assert concat("y", 3) == "yyy"
+    assert concat.cache_info() == (1, 1, 128, 1)
+    assert concat(a="z", b=1) == "z"  # другой ключ: kwargs
+    assert concat.cache_info() == (1, 2, 128, 2)
+
+    with pytest.raises(TypeError, match="Argument 'b' must be int, not str"):
+        concat("x", "2")
+    assert concat.cache_info() == (1, 3, 128, 2)
+
+
+def test_type_cache_disabled():
+    "Проверяет отключение кэша."
+
+    @strict(cache_size=0)
+    def double(a: int) -> int:
+        return a * 2
+
+    assert double(a=2) == 4
+    assert not hasattr(double, "cache_info")
+
+
+def test_validate_many_rows():
+    "Проверяет пакетную проверку строк."
+    assert strict.validate_many(sum_two, [(1, 2), (3, True), (5, 6)]) is None
+    assert strict.validate_many(sum_two, [(1, 2), (3, 4.0), ("5", 6)]) == 1
+    assert strict.validate_many(sum_two, [(1, 2), (3,), ("5", 6)]) == 1
+    assert strict.validate_many(sum_two, []) is None
+
+
+def test_validate_many_columns():
+    "Проверяет пакетную проверку колонок."
+    columns = {"a": [1, 2, 3, 4], "b": [5, 6, 7, 8]}
+    assert strict.validate_many(sum_two, columns) is None
+    columns["b"][3] = "8"
+    columns["a"][2] = None
+    assert strict.validate_many(sum_two, columns) == 2
+    with pytest.raises(ValueError, match="Columns must have equal length"):
+        strict.validate_many(sum_two, {"a": [1], "b": [1, 2]})
+    with pytest.raises(TypeError, match=re.escape("['b']")):
+        strict.validate_many(sum_two, {"a": [1]})
+
+
+@pytest.fixture
+def restore_mode():
+    mode = solution.get_mode()
+    yield
+    solution.set_mode(mode, solution.DEFAULT_SAMPLE_RATE)
+
+
+@pytest.mark.parametrize("codegen", [True, False])
+def test_sampled_mode(restore_mode, codegen):
+    "Проверяет режим sampled и счётчики вызовов."
+
+    @strict(codegen=codegen)
+    def double(a: int) -> int:
+        return a * 2
+
+    solution.set_mode(solution.SAMPLED, sample_rate=3)
+    results = []
+    for _ in range(6):
+        try:
+            results.append(double("x"))
+        except TypeError:
+            results.append(None)
+    assert results == [None, "xx", "xx", None, "xx", "xx"]
+    assert double.strict_stats() == (2, 4)
+
+    solution.set_mode(solution.ALWAYS)
+    assert double(2) == 4
+    assert double.strict_stats().checked == 3
+
+
+def test_off_mode(restore_mode):
+    "Проверяет отключение проверок во время работы и при декорировании."
+    stats = sum_two.strict_stats()
+    solution.set_mode(solution.OFF)
+    assert sum_two("1", "2") == "12"
+    assert sum_two.strict_stats() == stats
+
+    def raw(a: int) -> int:
+        return a
+
+    assert strict(raw) is raw
+    with pytest.raises(ValueError, match="Unknown strict mode"):
+        solution.set_mode("never")
+
+
+class Point(TypedDict):
+    x: int
+    y: int
+
+
+@pytest.mark.parametrize("codegen", [True, False])
+def test_generic_annotations(codegen):
+    "Проверяет generic-аннотации, объединения, Literal и TypedDict."
+
+    @strict(codegen=codegen)
+    def describe(
+        items: list[int],
+        mapping: dict[str, float],
+        limit: int | None,
+        mode: Literal["fast", "slow"],
+        point: Point,
+        extra: Any,
+    ) -> str:
+        return mode
+
+    ok = ([1, 2], {"a": 1.0}, None, "fast", {"x": 1, "y": 2}, object())
+    assert describe(*ok) == "fast"
+    assert describe(*ok[:2], limit=3, mode="slow", point=ok[4], extra=1)
+    assert not hasattr(describe, "cache_info")  # проверки зависят от значений
+
+    cases = [
+        (0, [1, "2"], "Argument 'items' must be list[int], not list"),
+        (1, {"a": 1}, "Argument 'mapping' must be dict[str, float], not dict"),
+        (2, 1.5, "Argument 'limit' must be int | None, not float"),
+        (
+            3,
+            "medium",
+            "Argument 'mode' must be Literal['fast', 'slow'], not str",
+        ),
+        (4, {"x": 1}, "Argument 'point' must be Point, not dict"),
+    ]
+    for index, value, message in cases:
+        args = list(ok)
+        args[index] = value
+        with pytest.raises(TypeError, match=re.escape(message)):
+            describe(*args)
+
+
+def test_optional_union_uses_cache():
+    "Проверяет, что объединение классов остаётся проверкой по типу."
+
+    @strict(codegen=False)
+    def first(value: Optional[int]) -> int:
+        return value or 0
+
+    assert first(None) == 0 and first(value=5) == 5
+    assert first.cache_info().misses == 2
+    with pytest.raises(TypeError, match=re.escape("Optional[int], not str")):
+        first("5")
+
+
+def test_max_items():
+    "Проверяет ограничение числа проверяемых элементов коллекции."
+
+    @strict(max_items=2)
+    def total(values: list[int]) -> int:
+        return len(values)
+
+    @strict(max_items=None)
+    def total_full(values: list[int]) -> int:
+        return len(values)
+
+    assert total([1, 2, "3"]) == 3  # третий элемент не проверяется
+    with pytest.raises(TypeError, match="must be list\\[int\\]"):
+        total_full([1, 2, "3"])
+    assert strict.validate_many(total_full, [([1],), ([2, "x"],)]) == 1
+
+
+def test_coroutine_function():
+    "Проверяет корутины: аргументы при вызове, результат — по запросу."
+
+    @strict
+    async def fetch(a: int) -> int:
+        return a
+
+    @strict(check_return=True)
+    async def fetch_checked(a: int) -> int:
+        return str(a)
+
+    assert asyncio.iscoroutinefunction(fetch)
+    assert asyncio.iscoroutinefunction(fetch_checked)
+    if hasattr(inspect, "markcoroutinefunction"):  # Python 3.12+
+        assert inspect.iscoroutinefunction(fetch_checked)
+    assert asyncio.run(fetch(1)) == 1
+    with pytest.raises(TypeError, match="Argument 'a' must be int, not str"):
+        fetch("1")  # ошибка до создания корутины
+    with pytest.raises(TypeError, match="Return value must be int, not str"):
+        asyncio.run(fetch_checked(1))
+
+
+def test_return_check():
+    "Проверяет проверку возвращаемого значения."
+
+    @strict(check_return=True)
+    def half(a: int) -> int:
+        return a / 2
+
+    with pytest.raises(TypeError, match="Return value must be int, not float"):
+        half(2)
+    with pytest.raises(TypeError, match="Return value must be int, not float"):
+        half(a=2)
+
+
+def test_generator_yield_sampling():
+    "Проверяет выборочную проверку yield и return генератора."
+
+    @strict(check_return=True, yield_every=2)
+    def numbers(values: list) -> Generator[int, int, str]:
+        received = 0
+        for value in values:
+            received += (yield value) or 0
+        return str(received)
+
+    assert list(numbers([1, "x", 3])) == [1, "x", 3]  # "x" не проверялся
+    with pytest.raises(TypeError, match="Yielded value must be int, not str"):
+        list(numbers([1, 2, "x"]))
+
+    gen = numbers([1, 2])
+    assert next(gen) == 1
+    assert gen.send(10) == 2
+    with pytest.raises(StopIteration) as stop:
+        gen.send(5)
+    assert stop.value.value == "15"
+
+    @strict
+    def plain(n: int) -> Generator[int, None, None]:
+        yield n
+
+    gen = plain(1)
+    assert gen.__name__ == "plain"  # без обёртки-генератора
+
+
+def test_async_generator_yield_check():
+    "Проверяет проверку значений асинхронного генератора."
+
+    @strict(check_return=True, yield_every=1)
+    async def stream(values: list) -> AsyncIterator[int]:
+        for value in values:
+            yield value
+
+    async def collect(values):
+        return [value async for value in stream(values)]
+
+    assert asyncio.run(collect([1, 2])) == [1, 2]
+    with pytest.raises(TypeError, match="Yielded value must be int, not str"):
+        asyncio.run(collect([1, "2"]))
@@ -1,7 +1,24 @@
+import asyncio
+import json
 import logging
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+from typing import Any, Callable, NamedTuple
 
 import aiohttp
-from my_backoff import backoff
+from hedging import HedgePolicy
+from http_cache import NOT_MODIFIED, Fetched, ResponseCache, make_key
+from limiter import Limiter
+from metrics import LIMITER, RATE_LIMITER, Metrics, request_label, timed
+from my_backoff import DECORRELATED, CircuitBreaker, TokenBucket, backoff
+from singleflight import SingleFlight
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson необязателен
+    orjson = None
 
 logging.basicConfig(
     level=logging.INFO,
@@ -12,71 +29,468 @@ logger = logging.getLogger("api_client")
 
 
 class HTTPException(Exception):
-    def __init__(self, status_code, detail, response_text=None):
+    def __init__(
+        self, status_code, detail, response_text=None, retry_after=None
+    ):
         super().__init__(f"HTTP error {status_code}: {detail}")
         self.status_code = status_code
         self.detail = detail
         self.response_text = response_text
+        self.retry_after = retry_after
+
+
+class TooManyRequests(HTTPException):
+    """429: ошибка клиента, после которой повтор всё же разумен."""
 
 
 class ServerError(Exception):
-    def __init__(self, status_code, detail, response_text=None):
+    def __init__(
+        self, status_code, detail, response_text=None, retry_after=None
+    ):
         super().__init__(f"Server error {status_code}: {detail}")
         self.status_code = status_code
         self.detail = detail
         self.response_text = response_text
+        self.retry_after = retry_after
+
+
+class MaxLagError(ServerError):
+    """Ответ MediaWiki error.code=maxlag: реплики отстают, нужно подождать."""
+
+
+# Разбор JSON из байтов тела ответа: orjson, если установлен.
+JSONLoads = Callable[[bytes], Any]
+default_json_loads: JSONLoads = orjson.loads if orjson else json.loads
+
+TOO_MANY_REQUESTS = 429
+SERVICE_UNAVAILABLE = 503
+DEFAULT_MAXLAG_DELAY = 5.0
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Retry-After в секундах: число секунд или HTTP-дата."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def status_error(
+    status: int, response_text: str, retry_after: float | None
+) -> Exception:
+    """Исключение для ответа с кодом 4xx/5xx."""
+    if status == TOO_MANY_REQUESTS:
+        return TooManyRequests(
+            status_code=status,
+            detail=f"Client error: {response_text}",
+            response_text=response_text,
+            retry_after=retry_after,
+        )
+    if status < 500:
+        return HTTPException(
+            status_code=status,
+            detail=f"Client error: {response_text}",
+            response_text=response_text,
+        )
+    return ServerError(
+        status_code=status,
+        detail=f"Server error: {response_text}",
+        response_text=response_text,
+        retry_after=retry_after,
+    )
+
+
+def maxlag_error(data: Any, retry_after: float | None) -> MaxLagError | None:
+    """MaxLagError, если тело ответа — ошибка maxlag MediaWiki."""
+    if not isinstance(data, dict):
+        return None
+    error = data.get("error")
+    if not isinstance(error, dict) or error.get("code") != "maxlag":
+        return None
+    return MaxLagError(
+        status_code=SERVICE_UNAVAILABLE,
+        detail=error.get("info", "maxlag"),
+        retry_after=(
+            retry_after if retry_after is not None else DEFAULT_MAXLAG_DELAY
+        ),
+    )
+
+
+def is_overload(error: Exception) -> bool:
+    """Признак перегрузки сервера: 429, 5xx, таймаут или обрыв связи."""
+    if isinstance(error, HTTPException):
+        return error.status_code == TOO_MANY_REQUESTS
+    return isinstance(
+        error, (ServerError, aiohttp.ClientError, asyncio.TimeoutError)
+    )
+
+
+RETRY_POLICY: dict[str, Any] = dict(
+    start_sleep_time=0.1,
+    factor=2,
+    border_sleep_time=10,
+    max_restart=5,
+    errors=(
+        aiohttp.ClientError,
+        aiohttp.ServerTimeoutError,
+        asyncio.TimeoutError,
+        ServerError,
+        TooManyRequests,
+    ),
+    client_errors=(HTTPException,),
+    jitter=DECORRELATED,
+)
+
+
+class PoolConfig(NamedTuple):
+    """
+    Настройки пула соединений и таймаутов APIClient.
+
+    limit / limit_per_host ограничивают число одновременных соединений
+    на уровне коннектора; keepalive_timeout — сколько секунд держать
+    простаивающее соединение для повторного использования; ttl_dns_cache
+    — время кеширования DNS в секундах; compress — просить у сервера
+    gzip/deflate. Таймауты в секундах, None — без ограничения:
+    total/connect/sock_read действуют на каждую попытку, deadline — на
+    весь request со всеми повторами и паузами.
+    """
+
+    limit: int = 100
+    limit_per_host: int = 10
+    ttl_dns_cache: int | None = 300
+    keepalive_timeout: float = 30
+    compress: bool = True
+    total_timeout: float | None = 60
+    connect_timeout: float | None = 10
+    sock_read_timeout: float | None = 30
+    deadline: float | None = 180
+
+
+class PoolStats(NamedTuple):
+    """Статистика использования пула соединений."""
+
+    limit: int
+    limit_per_host: int
+    new_connections: int
+    reused_connections: int
+    queued: int
+    in_flight: int
+    peak_in_flight: int
 
 
 class APIClient:
-    def __init__(self, base_url: str):
+    """
+    Асинхронный клиент API поверх aiohttp.
+
+    Все запросы идут через общий TCPConnector, настроенный по
+    PoolConfig: соединения переиспользуются (keep-alive), а
+    одновременных запросов к хосту не больше limit_per_host. Можно
+    передать готовый connector, чтобы несколько клиентов делили пул;
+    тогда клиент его не закрывает. С cache GET-запросы отдаются из
+    ResponseCache и перепроверяются условными запросами (кроме
+    request(..., use_cache=False)). limiter
+    (см. limiter.py) ограничивает число одновременных попыток и
+    получает исход каждой, включая повторы backoff. rate_limiter —
+    общий TokenBucket: попытка берёт токен, а Retry-After от сервера
+    приостанавливает всё ведро. С maxlag к запросам добавляется
+    параметр maxlag MediaWiki, а ответ-ошибка maxlag повторяется после
+    указанной сервером паузы. breaker — CircuitBreaker для повторов
+    request (см. my_backoff.backoff). С hedge медленные GET-запросы
+    дублируются по HedgePolicy внутри уже полученных токена и слота,
+    берётся первый ответ. json_loads
+    разбирает сырые байты тела (по умолчанию orjson, если он есть),
+    минуя декодирование в str внутри aiohttp. В metrics пишутся время,
+    статус и размер ответа каждой попытки, а также повторы backoff.
+    С single_flight одинаковые GET-запросы (только params), которые уже
+    выполняются, не отправляются повторно, а ждут результата первого,
+    вместе с его повторами.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        config: PoolConfig = PoolConfig(),
+        connector: aiohttp.TCPConnector | None = None,
+        cache: ResponseCache | None = None,
+        limiter: Limiter | None = None,
+        rate_limiter: TokenBucket | None = None,
+        maxlag: int | None = None,
+        breaker: CircuitBreaker | None = None,
+        hedge: HedgePolicy | None = None,
+        json_loads: JSONLoads = default_json_loads,
+        metrics: Metrics | None = None,
+        single_flight: SingleFlight | None = None,
+    ):
         self.base_url = base_url
+        self.config = config
+        self.cache = cache
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.maxlag = maxlag
+        self.hedge = hedge
+        self.json_loads = json_loads
+        self.metrics = metrics
+        self.single_flight = single_flight
         self.session: aiohttp.ClientSession | None = None
+        self._connector = connector
+        self._new_connections = 0
+        self._reused_connections = 0
+        self._queued = 0
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self.breaker = breaker
+        # Повторы оборачиваются на экземпляре, чтобы у каждого клиента
+        # был свой (или общий с другими) CircuitBreaker.
+        self._retrying = backoff(
+            **RETRY_POLICY,
+            breaker=breaker,
+            deadline=config.deadline,
+            metrics=metrics,
+        )(self._request)
+
+    async def request(
+        self, method: str, endpoint: str, use_cache: bool = True, **kwargs
+    ):
+        """
+        Выполняет запрос с повторами. use_cache=False — GET мимо cache:
+        ответ берётся с сервера и в кеш не записывается.
+        """
+        if (
+            self.single_flight is None
+            or method.upper() != "GET"
+            or kwargs.keys() - {"params"}
+        ):
+            return await self._retrying(method, endpoint, use_cache, **kwargs)
+        key = make_key(method, endpoint, kwargs.get("params")), use_cache
+        return await self.single_flight.run(
+            key, lambda: self._retrying(method, endpoint, use_cache, **kwargs)
+        )
+
+    def _make_connector(self) -> aiohttp.TCPConnector:
+        return aiohttp.TCPConnector(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host,
+            ttl_dns_cache=self.config.ttl_dns_cache,
+            use_dns_cache=self.config.ttl_dns_cache is not None,
+            keepalive_timeout=self.config.keepalive_timeout,
+        )
+
+    def _make_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_create(session, context, params: SimpleNamespace):
+            self._new_connections += 1
+
+        async def on_reuse(session, context, params: SimpleNamespace):
+            self._reused_connections += 1
+
+        async def on_queued(session, context, params: SimpleNamespace):
+            self._queued += 1
+
+        trace_config.on_connection_create_end.append(on_create)
+        trace_config.on_connection_reuseconn.append(on_reuse)
+        trace_config.on_connection_queued_start.append(on_queued)
+        return trace_config
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        owner = self._connector is None
+        connector = self._connector or self._make_connector()
+        headers = {}
+        if not self.config.compress:
+            headers["Accept-Encoding"] = "identity"
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=owner,
+            timeout=aiohttp.ClientTimeout(
+                total=self.config.total_timeout,
+                sock_connect=self.config.connect_timeout,
+                sock_read=self.config.sock_read_timeout,
+            ),
+            headers=headers,
+            trace_configs=[self._make_trace_config()],
+        )
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
         if self.session:
             await self.session.close()
 
-    @backoff(
-        start_sleep_time=0.1,
-        factor=2,
-        border_sleep_time=10,
-        max_restart=5,
-        errors=(aiohttp.ClientError, aiohttp.ServerTimeoutError, ServerError),
-        client_errors=(HTTPException,),
-    )
-    async def request(self, method: str, endpoint: str, **kwargs):
+    def pool_stats(self) -> PoolStats:
+        """Текущая статистика пула: новые и переиспользованные соединения,
+        ожидания свободного слота и запросы в работе."""
+        connector = self.session.connector if self.session else None
+        return PoolStats(
+            limit=connector.limit if connector else self.config.limit,
+            limit_per_host=(
+                connector.limit_per_host
+                if connector
+                else self.config.limit_per_host
+            ),
+            new_connections=self._new_connections,
+            reused_connections=self._reused_connections,
+            queued=self._queued,
+            in_flight=self._in_flight,
+            peak_in_flight=self._peak_in_flight,
+        )
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Статистика пула и подключённых компонентов по именам (для отчёта)."""
+        stats = {"pool": self.pool_stats()._asdict()}
+        for name in ("limiter", "hedge", "single_flight", "cache"):
+            component = getattr(self, name)
+            if component is not None:
+                stats[name] = component.stats()._asdict()
+        return stats
+
+    async def _request(
+        self, method: str, endpoint: str, use_cache: bool = True, **kwargs
+    ):
         if not self.session:
             logger.error("APIClient used outside async context manager")
             raise RuntimeError(
                 "APIClient must be used within an async context manager"
             )
+        is_get = method.upper() == "GET"
+
+        async def send(headers: dict[str, str]) -> Fetched:
+            return await self._send(
+                method, endpoint, headers, hedged=is_get, **kwargs
+            )
+
+        if self.cache is None or not is_get or not use_cache:
+            return (await send({})).data
+        key = make_key(method, endpoint, kwargs.get("params"))
+        return await self.cache.fetch(key, send)
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        headers: dict[str, str],
+        hedged: bool = False,
+        **kwargs,
+    ) -> Fetched:
+        if self.maxlag is not None:
+            kwargs["params"] = {
+                **kwargs.get("params", {}),
+                "maxlag": str(self.maxlag),
+            }
+        started = await self._admit()
+        dropped = False
+        try:
+            return await self._exchange(
+                method, endpoint, headers, hedged, **kwargs
+            )
+        except Exception as e:
+            dropped = is_overload(e)
+            delay = getattr(e, "retry_after", None)
+            if self.rate_limiter is not None and delay is not None:
+                self.rate_limiter.pause(delay)
+            raise
+        finally:
+            if self.limiter is not None:
+                self.limiter.release(started, dropped)
+
+    async def _admit(self) -> float:
+        """
+        Ждёт токен и слот ограничителей; возвращает отметку занятия
+        слота для limiter.release.
+        """
+        if self.rate_limiter is not None:
+            await timed(self.rate_limiter.acquire(), self.metrics, RATE_LIMITER)
+        started = 0.0
+        if self.limiter is not None:
+            started = await timed(self.limiter.acquire(), self.metrics, LIMITER)
+        return started
+
+    async def _exchange(
+        self,
+        method: str,
+        endpoint: str,
+        headers: dict[str, str],
+        hedged: bool,
+        **kwargs,
+    ) -> Fetched:
+        # Хеджируется только обмен с сервером внутри занятого слота:
+        # очередь ограничителей не входит в задержку хеджа, а дубликат
+        # не берёт лишних токенов и слотов.
+        if self.hedge is None or not hedged:
+            return await self._perform(method, endpoint, headers, **kwargs)
+        return await self.hedge.run(
+            lambda: self._perform(method, endpoint, headers, **kwargs)
+        )
+
+    def _observe(
+        self,
+        endpoint: str,
+        kwargs: dict[str, Any],
+        status: int | str,
+        started: float,
+        size: int,
+    ) -> None:
+        if self.metrics is not None:
+            self.metrics.observe_request(
+                request_label(endpoint, kwargs.get("params")),
+                status,
+                time.monotonic() - started,
+                size,
+            )
+
+    async def _parse(
+        self, response: aiohttp.ClientResponse, body: bytes
+    ) -> Fetched:
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        if response.status >= 400:
+            raise status_error(
+                response.status, await response.text(), retry_after
+            )
+        if response.status == NOT_MODIFIED:
+            return Fetched(NOT_MODIFIED, None)
+        data = self.json_loads(body)
+        lagged = maxlag_error(data, retry_after)
+        if lagged is not None:
+            raise lagged
+        return Fetched(
+            response.status,
+            data,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+
+    async def _perform(
+        self, method: str, endpoint: str, headers: dict[str, str], **kwargs
+    ) -> Fetched:
         url = f"{self.base_url}{endpoint}"
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        started = time.monotonic()
+        status: int | str | None = None
+        size = 0
         try:
-            async with self.session.request(method, url, **kwargs) as response:
-                response_text = (
-                    await response.text() if response.status >= 400 else None
+            async with self.session.request(
+                method, url, headers=headers, **kwargs
+            ) as response:
+                status = response.status
+                body = await response.read()
+                size = len(body)
+                return await self._parse(response, body)
+        except BaseException as e:
+            # Ответа нет — вместо кода учитывается класс ошибки.
+            status = status or type(e).__name__
+            if isinstance(e, aiohttp.ClientError):
+                logger.debug(
+                    f"Network error during request to "
+                    f"{url} (will retry): {e}",
+                    extra={"method": method, "endpoint": endpoint},
                 )
-                if 400 <= response.status < 500:
-                    raise HTTPException(
-                        status_code=response.status,
-                        detail=f"Client error: {response_text}",
-                        response_text=response_text,
-                    )
-                elif 500 <= response.status < 600:
-                    raise ServerError(
-                        status_code=response.status,
-                        detail=f"Server error: {response_text}",
-                        response_text=response_text,
-                    )
-                return await response.json()
-        except aiohttp.ClientError as client_error:
-            logger.warning(
-                f"Network error during request to "
-                f"{url} (will retry): {client_error}",
-                extra={"method": method, "endpoint": endpoint},
-            )
-            raise client_error
+            raise
+        finally:
+            self._in_flight -= 1
+            self._observe(endpoint, kwargs, status, started, size)
@@ -0,0 +1,147 @@
+# python bench_crawler.py [--size 500000] [--json out.json]
+"""
+Бенчмарк горячего цикла обхода на синтетическом корпусе заголовков.
+
+Сравнивает прежнюю normalize_first_char (re.sub по каждому заголовку)
+с текущей, а также разбор
+страниц ответа с полными полями участника (pageid, ns, title) и только
+с title — встроенным json и orjson, если он установлен.
+"""
+import argparse
+import json
+import platform
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+from typing import Any, Callable
+
+from wiki import ALPHABET, normalize_first_char
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PAGE_SIZE = 500
+DEFAULT_SIZE = 500_000
+
+
+def legacy_normalize_first_char(title: str) -> str:
+    """normalize_first_char до оптимизации — точка отсчёта."""
+    if not title:
+        return "#"
+    first_char = re.sub(r"^[^а-яА-ЯёЁ]*", "", title)
+    if not first_char:
+        return "#"
+    first_char = first_char[0].upper()
+    return "Е" if first_char in ("Ё", "Е") else first_char
+
+
+def make_titles(size: int, seed: int = 0) -> list[str]:
+    """
+    Корпус, похожий на категорию: в основном кириллица, немного
+    заголовков с цифрами/кавычками в начале и латиницы.
+    """
+    rng = random.Random(seed)
+    letters = ALPHABET[1:] + "Ё"
+    titles = []
+    for i in range(size):
+        word = rng.choice(letters) + "".join(
+            rng.choice(letters).lower() for _ in range(rng.randint(3, 12))
+        )
+        roll = rng.random()
+        if roll < 0.05:
+            word = f"{rng.randint(1, 99)} {word.lower()}"
+        elif roll < 0.08:
+            word = f"«{word}»"
+        elif roll < 0.12:
+            word = f"Animal {i}"
+        titles.append(word)
+    return titles
+
+
+def make_pages(titles: list[str], full: bool) -> list[bytes]:
+    """Тела ответов categorymembers по PAGE_SIZE участников."""
+    pages = []
+    for start in range(0, len(titles), PAGE_SIZE):
+        members = [
+            (
+                {"pageid": start + i, "ns": 0, "title": title}
+                if full
+                else {"title": title}
+            )
+            for i, title in enumerate(titles[start : start + PAGE_SIZE])
+        ]
+        body = {"query": {"categorymembers": members}}
+        pages.append(json.dumps(body, ensure_ascii=False).encode("utf-8"))
+    return pages
+
+
+def best_seconds(func: Callable[[], Any], repeat: int) -> float:
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def run(size: int, repeat: int) -> dict[str, Any]:
+    titles = make_titles(size)
+    assert list(map(normalize_first_char, titles)) == list(
+        map(legacy_normalize_first_char, titles)
+    )
+
+    cases = {
+        "normalize/legacy": lambda: list(
+            map(legacy_normalize_first_char, titles)
+        ),
+        "normalize/current": lambda: list(map(normalize_first_char, titles)),
+    }
+    loaders = {"json": json.loads}
+    if orjson is not None:
+        loaders["orjson"] = orjson.loads
+    for props, full in (("full", True), ("title", False)):
+        pages = make_pages(titles, full)
+        payload = sum(map(len, pages))
+        print(f"payload/{props}: {payload / 2**20:.1f} MiB")
+        for name, loads in loaders.items():
+            cases[f"decode/{props}/{name}"] = lambda loads=loads, pages=pages: [
+                loads(p) for p in pages
+            ]
+
+    results = {}
+    for key, func in cases.items():
+        seconds = best_seconds(func, repeat)
+        results[key] = {
+            "seconds": round(seconds, 4),
+            "ns_per_title": round(seconds / size * 1e9, 1),
+        }
+        print(f"{key:<24}{seconds:8.3f} s  {seconds / size * 1e9:7.1f} ns")
+
+    for old, new in (
+        ("normalize/legacy", "normalize/current"),
+        ("decode/full/json", f"decode/title/{next(reversed(loaders))}"),
+    ):
+        speedup = results[old]["seconds"] / results[new]["seconds"]
+        print(f"{new} vs {old}: x{speedup:.2f}")
+
+    return {
+        "python": platform.python_version(),
+        "size": size,
+        "results": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=DEFAULT_SIZE)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", type=Path, help="куда сохранить результаты")
+    args = parser.parse_args()
+
+    results = run(args.size, args.repeat)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# python bench_server.py --size 1000000 [--latency 0.02] [--error-rate 0.01]
+"""
+Нагрузочный прогон solution.main против локального fake_wiki.
+
+Сервер работает в отдельном процессе, чтобы его работа не делила CPU
+с клиентом; клиент — обычный make_client, но без ограничения частоты
+(если не задан --rps). Печатает страниц в секунду, число запросов,
+p50/p99 задержки categorymembers и сверяет итог с ожидаемым.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import multiprocessing
+import platform
+import socket
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from api_client import PoolConfig
+from crawler import API_ENDPOINT
+from fake_wiki import (
+    FaultConfig,
+    SyntheticCategory,
+    add_fault_arguments,
+    faults_from_args,
+    serve,
+)
+from metrics import request_label
+from solution import main
+from wiki import MAX_CONCURRENT_REQUESTS
+
+LABEL = request_label(API_ENDPOINT, {"list": "categorymembers"})
+
+
+def summarize(report: dict[str, Any]) -> dict[str, Any]:
+    """Главные числа прогона из отчёта solution.main."""
+    pages = sum(p["pages"] for p in report["partitions"].values())
+    latency = report["requests"][LABEL]["latency"]
+    wall_time = report["wall_time"]
+    return {
+        "wall_time": wall_time,
+        "pages": pages,
+        "pages_per_second": round(pages / wall_time, 1),
+        "requests": sum(
+            r["latency"]["count"] for r in report["requests"].values()
+        ),
+        "statuses": report["requests"][LABEL]["statuses"],
+        "retries": report["retries"],
+        "p50": latency["p50"],
+        "p99": latency["p99"],
+        "backoff_sleep": report["backoff_sleep"],
+        "semaphore_wait": report["semaphore_wait"]["sum"],
+        "waits": {kind: wait["sum"] for kind, wait in report["waits"].items()},
+        "bytes": report["bytes"],
+    }
+
+
+def run(
+    size: int,
+    faults: FaultConfig = FaultConfig(),
+    seed: int | None = 0,
+    rps: float | None = None,
+    read_timeout: float | None = PoolConfig().sock_read_timeout,
+    workers: int = 1,
+) -> dict[str, Any]:
+    sock = socket.create_server(("127.0.0.1", 0))
+    host, port = sock.getsockname()[:2]
+    # fork: дочерний процесс наследует уже слушающий сокет.
+    server = multiprocessing.get_context("fork").Process(
+        target=serve, args=(sock, size, faults, seed), daemon=True
+    )
+    server.start()
+    sock.close()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            report_path = Path(tmp, "report.json")
+            csv_path = Path(tmp, "beasts.csv")
+            config = PoolConfig(
+                limit_per_host=MAX_CONCURRENT_REQUESTS,
+                sock_read_timeout=read_timeout,
+            )
+            asyncio.run(
+                main(
+                    report_path=str(report_path),
+                    csv_path=str(csv_path),
+                    client_options={
+                        "base_url": f"http://{host}:{port}",
+                        "config": config,
+                        "rate": rps,
+                    },
+                    workers=workers,
+                )
+            )
+            report = json.loads(report_path.read_text(encoding="utf-8"))
+            with open(csv_path, encoding="utf-8-sig") as file:
+                rows = csv.reader(file)
+                next(rows)  # заголовок
+                counts = {letter: int(count) for letter, count in rows}
+    finally:
+        server.terminate()
+        server.join()
+
+    summary = summarize(report)
+    summary["correct"] = counts == SyntheticCategory(size).counts()
+    return {
+        "python": platform.python_version(),
+        "size": size,
+        "faults": faults._asdict(),
+        "rps": rps,
+        "workers": workers,
+        "summary": summary,
+    }
+
+
+def cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_fault_arguments(parser)
+    parser.add_argument("--rps", type=float, help="лимит запросов в секунду")
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=PoolConfig().sock_read_timeout,
+        help="таймаут чтения клиента, секунды",
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="куда сохранить результаты")
+    args = parser.parse_args()
+
+    results = run(
+        args.size,
+        faults_from_args(args),
+        args.seed,
+        args.rps,
+        args.read_timeout,
+        args.workers,
+    )
+    for key, value in results["summary"].items():
+        print(f"{key:<18}{value}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return 0 if results["summary"]["correct"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,160 @@
+import json
+import os
+import time
+from collections import Counter
+from typing import IO, Mapping, NamedTuple
+
+from crawler import Page, Partition
+
+DEFAULT_FLUSH_EVERY = 50
+DEFAULT_FSYNC_INTERVAL = 1.0
+
+
+class PartitionState(NamedTuple):
+    """Сохранённый прогресс диапазона: токен продолжения и частичные счётчики."""
+
+    continue_token: str | None
+    counts: Counter
+    done: bool
+
+
+class Checkpoint:
+    """
+    Журнал прогресса обхода в файле JSON Lines.
+
+    Каждая обработанная страница дописывает строку с приращением
+    счётчиков и токеном следующей страницы диапазона, поэтому запись
+    атомарна на уровне строки: токен и счётчики теряются или
+    сохраняются вместе, а оборванная последняя строка при загрузке
+    отбрасывается. Буфер сбрасывается на диск (fsync) раз в flush_every
+    записей или fsync_interval секунд, а не на каждой странице.
+
+    При resume журнал сначала сжимается до строки на диапазон и
+    атомарно подменяется (os.replace), после чего дописывается дальше.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        resume: bool = False,
+        flush_every: int = DEFAULT_FLUSH_EVERY,
+        fsync_interval: float = DEFAULT_FSYNC_INTERVAL,
+    ):
+        self.path = path
+        self.flush_every = flush_every
+        self.fsync_interval = fsync_interval
+        self.state: dict[Partition, PartitionState] = {}
+        if resume:
+            self.state = load_state(path)
+            _compact(path, self.state)
+        self._file: IO[str] = open(
+            path, "a" if resume else "w", encoding="utf-8"
+        )
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def counts(self) -> Counter:
+        """Счётчики, накопленные в прошлых запусках."""
+        total: Counter = Counter()
+        for state in self.state.values():
+            total.update(state.counts)
+        return total
+
+    def pending(self, partitions: list[Partition]) -> list[Partition]:
+        """Диапазоны, обход которых ещё не завершён."""
+        return [
+            p
+            for p in partitions
+            if p not in self.state or not self.state[p].done
+        ]
+
+    def tokens(self) -> dict[Partition, str]:
+        """Токены, с которых нужно продолжить незавершённые диапазоны."""
+        return {
+            partition: state.continue_token
+            for partition, state in self.state.items()
+            if state.continue_token and not state.done
+        }
+
+    def record(self, page: Page, counts: Mapping[str, int]) -> None:
+        """Дописывает прогресс после обработки страницы."""
+        self._file.write(_dump(page.partition, page.continue_token, counts))
+        self._pending += 1
+        if (
+            self._pending >= self.flush_every
+            or time.monotonic() - self._synced_at >= self.fsync_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._synced_at = time.monotonic()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def remove(self) -> None:
+        """Удаляет журнал после успешного завершения обхода."""
+        self.close()
+        os.remove(self.path)
+
+
+def _dump(
+    partition: Partition, continue_token: str | None, counts: Mapping[str, int]
+) -> str:
+    record = {
+        "partition": list(partition),
+        "continue": continue_token,
+        "counts": counts,
+    }
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _compact(path: str, state: Mapping[Partition, PartitionState]) -> None:
+    """Атомарно перезаписывает журнал одной строкой на диапазон."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        for partition, partition_state in state.items():
+            file.write(
+                _dump(
+                    partition,
+                    partition_state.continue_token,
+                    partition_state.counts,
+                )
+            )
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_state(path: str) -> dict[Partition, PartitionState]:
+    """Восстанавливает прогресс диапазонов из журнала."""
+    state: dict[Partition, PartitionState] = {}
+    try:
+        with open(path, encoding="utf-8") as file:
+            lines = file.readlines()
+    except FileNotFoundError:
+        return state
+
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            break  # оборванная при сбое последняя строка
+        partition = Partition(*record["partition"])
+        counts = state[partition].counts if partition in state else Counter()
+        counts.update(record["counts"])
+        token = record["continue"]
+        state[partition] = PartitionState(token, counts, token is None)
+    return state
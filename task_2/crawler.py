@@ -0,0 +1,219 @@
+import asyncio
+import logging
+from asyncio import Semaphore
+from typing import Any, AsyncIterator, Mapping, NamedTuple
+
+from api_client import APIClient
+from metrics import acquire
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+logger = logging.getLogger("crawler")
+
+API_ENDPOINT = "/w/api.php"
+PAGE_LIMIT = "500"
+# Типы участников категории (cmtype) и их пространства имён.
+PAGES = "page|redirect"
+SUBCATEGORIES = "subcat"
+NAMESPACES = {PAGES: "0", SUBCATEGORIES: "14"}
+# Сколько страниц может ждать обработки, прежде чем загрузчики остановятся.
+DEFAULT_QUEUE_SIZE = 64
+
+
+class Partition(NamedTuple):
+    """Диапазон ключей сортировки категории [start, end); None — без границы."""
+
+    start: str | None
+    end: str | None
+
+    @property
+    def label(self) -> str:
+        return f"{self.start or ''}..{self.end or ''}"
+
+
+class Page(NamedTuple):
+    """Страница ответа categorymembers одного диапазона."""
+
+    partition: Partition
+    members: list[dict[str, Any]]
+    continue_token: str | None
+
+
+class _Failed(NamedTuple):
+    error: BaseException
+
+
+_DONE = object()
+
+
+def make_partitions(boundaries: str) -> list[Partition]:
+    """
+    Делит категорию на непересекающиеся диапазоны по границам-префиксам.
+
+    Первый диапазон — всё до первой границы (спецсимволы, цифры,
+    латиница), последний — всё начиная с последней границы.
+    """
+    edges = [None, *boundaries, None]
+    return [Partition(start, end) for start, end in zip(edges, edges[1:])]
+
+
+def category_params(
+    category: str,
+    partition: Partition,
+    continue_token: str | None = None,
+    member_type: str = PAGES,
+) -> dict[str, str]:
+    """Параметры запроса страницы categorymembers для диапазона."""
+    params = {
+        "action": "query",
+        "list": "categorymembers",
+        "cmtitle": category,
+        "cmtype": member_type,
+        "cmshow": "all",
+        "cmnamespace": NAMESPACES[member_type],
+        "cmlimit": PAGE_LIMIT,
+        "format": "json",
+        "cmsort": "sortkey",
+        # Нужен только заголовок: без pageid/ns ответ меньше и быстрее
+        # разбирается.
+        "cmprop": "title",
+    }
+    if partition.start:
+        params["cmstartsortkeyprefix"] = partition.start
+    if partition.end:
+        params["cmendsortkeyprefix"] = partition.end
+    if continue_token:
+        params["cmcontinue"] = continue_token
+    return params
+
+
+async def iter_partition_pages(
+    client: APIClient,
+    category: str,
+    partition: Partition,
+    semaphore: Semaphore,
+    continue_token: str | None = None,
+    member_type: str = PAGES,
+    use_cache: bool = True,
+) -> AsyncIterator[Page]:
+    """
+    Постранично обходит диапазон категории.
+
+    Семафор занимается только на время запроса, а не на всю пагинацию
+    диапазона; обход останавливается на границе диапазона. С
+    continue_token обход продолжается с сохранённой страницы,
+    member_type=SUBCATEGORIES перечисляет подкатегории вместо статей.
+    С client.metrics учитываются ожидание семафора и страницы диапазона,
+    use_cache=False запрашивает страницы мимо кеша клиента.
+    """
+    while True:
+        params = category_params(
+            category, partition, continue_token, member_type
+        )
+        async with acquire(semaphore, client.metrics):
+            response = await client.request(
+                "GET", API_ENDPOINT, use_cache=use_cache, params=params
+            )
+
+        if (
+            "query" not in response
+            or "categorymembers" not in response["query"]
+        ):
+            logger.error(f"Неверный формат ответа для {partition}: {response}")
+            return
+
+        continue_token = response.get("continue", {}).get("cmcontinue")
+        if client.metrics is not None:
+            client.metrics.observe_page(
+                f"{category}:{partition.label}",
+                len(response["query"]["categorymembers"]),
+            )
+        yield Page(
+            partition, response["query"]["categorymembers"], continue_token
+        )
+        if not continue_token:
+            return
+
+
+async def _produce(
+    client: APIClient,
+    category: str,
+    partitions: list[Partition],
+    semaphore: Semaphore,
+    queue: asyncio.Queue,
+    tokens: Mapping[Partition, str],
+    use_cache: bool = True,
+) -> None:
+    """Запускает загрузчики диапазонов и кладёт в очередь итог обхода."""
+
+    async def fetch(partition: Partition) -> None:
+        async for page in iter_partition_pages(
+            client,
+            category,
+            partition,
+            semaphore,
+            tokens.get(partition),
+            use_cache=use_cache,
+        ):
+            await queue.put(page)
+
+    tasks = [asyncio.create_task(fetch(p)) for p in partitions]
+    try:
+        await asyncio.gather(*tasks)
+    except Exception as e:
+        item: Any = _Failed(e)
+    else:
+        item = _DONE
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    await queue.put(item)
+
+
+async def crawl(
+    client: APIClient,
+    category: str,
+    partitions: list[Partition],
+    semaphore: Semaphore,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    tokens: Mapping[Partition, str] | None = None,
+    use_cache: bool = True,
+) -> AsyncIterator[Page]:
+    """
+    Обходит диапазоны параллельно и отдаёт страницы по мере загрузки.
+
+    Загрузчики диапазонов складывают страницы в ограниченную очередь
+    (queue_size), потребитель забирает их через async for; если он не
+    успевает, загрузчики ждут, поэтому память ограничена независимо от
+    размера категории. Ошибка загрузчика пробрасывается потребителю,
+    при закрытии итератора незавершённые загрузчики отменяются.
+    tokens задаёт токены продолжения для возобновляемых диапазонов,
+    use_cache=False — обход мимо кеша клиента.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    producer = asyncio.create_task(
+        _produce(
+            client,
+            category,
+            partitions,
+            semaphore,
+            queue,
+            tokens or {},
+            use_cache,
+        )
+    )
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failed):
+                raise item.error
+            yield item
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
@@ -0,0 +1,223 @@
+# python fake_wiki.py --size 1000000 --port 8080 [--latency 0.02]
+"""
+Локальная замена /w/api.php MediaWiki для нагрузочных прогонов.
+
+Отдаёт list=categorymembers синтетической категории любого размера с
+семантикой cmlimit, cmcontinue, cmstartsortkeyprefix и
+cmendsortkeyprefix; заголовки вычисляются по номеру и в памяти не
+хранятся. Задержку ответа, доли ответов 503 и 429 и зависаний дольше
+таймаута клиента можно задать (FaultConfig).
+"""
+import argparse
+import asyncio
+import bisect
+import random
+import socket
+from typing import NamedTuple, Sequence
+
+from aiohttp import web
+from crawler import API_ENDPOINT
+from wiki import ALPHABET, sortkey
+
+MAX_PAGE_LIMIT = 500
+# Доля заголовков без кириллицы (попадают в «#»).
+HEAD_SHARE = 0.02
+
+
+class SyntheticCategory(Sequence[str]):
+    """
+    size заголовков в порядке сортировки категории: сначала латиница,
+    затем равные блоки на каждую букву ALPHABET. Заголовок и ключ
+    сортировки вычисляются по номеру, так что категория на 10M записей
+    не занимает памяти.
+    """
+
+    def __init__(self, size: int, head_share: float = HEAD_SHARE):
+        self.size = size
+        letters = ALPHABET[1:]
+        head = int(size * head_share)
+        per_letter, extra = divmod(size - head, len(letters))
+        self.letters = ("#", *letters)
+        self.starts = [0, head]
+        for i in range(len(letters) - 1):
+            self.starts.append(
+                self.starts[-1] + per_letter + (1 if i < extra else 0)
+            )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.size))]
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        letter = self.letters[bisect.bisect_right(self.starts, index) - 1]
+        if letter == "#":
+            return f"Animal {index:09d}"
+        return f"{letter}ерь {index:09d}"
+
+    def find(self, prefix: str) -> int:
+        """Номер первого заголовка с ключом не меньше prefix."""
+        return bisect.bisect_left(
+            range(self.size), sortkey(prefix), key=lambda i: sortkey(self[i])
+        )
+
+    def counts(self) -> dict[str, int]:
+        """Ожидаемый итог подсчёта по буквам."""
+        ends = [*self.starts[1:], self.size]
+        return {
+            letter: end - start
+            for letter, start, end in zip(self.letters, self.starts, ends)
+        }
+
+
+class FaultConfig(NamedTuple):
+    """
+    Поведение сервера: задержка каждого ответа latency ± jitter секунд;
+    доли ответов 503 (error_rate), 429 с Retry-After: retry_after
+    (throttle_rate) и зависаний на hang секунд (timeout_rate).
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    timeout_rate: float = 0.0
+    hang: float = 60.0
+    retry_after: float = 0.0
+
+
+class FakeWiki:
+    """Обработчик /w/api.php поверх SyntheticCategory."""
+
+    def __init__(
+        self,
+        category: SyntheticCategory,
+        faults: FaultConfig = FaultConfig(),
+        seed: int | None = 0,
+    ):
+        self.category = category
+        self.faults = faults
+        self._random = random.Random(seed)
+        self.requests = 0
+
+    def bounds(self, params) -> tuple[int, int]:
+        """Диапазон номеров [start, end) для параметров запроса."""
+        if "cmcontinue" in params:
+            start = int(params["cmcontinue"])
+        elif params.get("cmstartsortkeyprefix"):
+            start = self.category.find(params["cmstartsortkeyprefix"])
+        else:
+            start = 0
+        end = len(self.category)
+        if params.get("cmendsortkeyprefix"):
+            end = self.category.find(params["cmendsortkeyprefix"])
+        return start, end
+
+    def member(self, index: int, props: list[str]) -> dict:
+        member: dict = {}
+        if "ids" in props:
+            member["pageid"] = index + 1
+        if "title" in props:
+            member["ns"] = 0
+            member["title"] = self.category[index]
+        return member
+
+    def page(self, params) -> dict:
+        """Ответ categorymembers для параметров запроса."""
+        start, end = self.bounds(params)
+        stop = min(
+            start + min(int(params.get("cmlimit", 10)), MAX_PAGE_LIMIT), end
+        )
+        props = params.get("cmprop", "ids|title").split("|")
+        members = [self.member(index, props) for index in range(start, stop)]
+        response: dict = {"query": {"categorymembers": members}}
+        if stop < end:
+            response["continue"] = {"cmcontinue": str(stop), "continue": "-||"}
+        return response
+
+    async def _fault(self) -> web.Response | None:
+        faults = self.faults
+        delay = faults.latency + self._random.uniform(
+            -faults.jitter, faults.jitter
+        )
+        await asyncio.sleep(max(0.0, delay))
+        roll = self._random.random()
+        if roll < faults.timeout_rate:
+            await asyncio.sleep(faults.hang)
+            return None
+        roll -= faults.timeout_rate
+        if roll < faults.error_rate:
+            return web.Response(status=503, text="Service Unavailable")
+        roll -= faults.error_rate
+        if roll < faults.throttle_rate:
+            return web.Response(
+                status=429, headers={"Retry-After": f"{faults.retry_after:g}"}
+            )
+        return None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        failure = await self._fault()
+        if failure is not None:
+            return failure
+        if request.query.get("list") != "categorymembers":
+            return web.json_response(
+                {"error": {"code": "badvalue", "info": "unsupported query"}}
+            )
+        return web.json_response(self.page(request.query))
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get(API_ENDPOINT, self.handle)
+        return app
+
+
+def serve(
+    sock: socket.socket,
+    size: int,
+    faults: FaultConfig = FaultConfig(),
+    seed: int | None = 0,
+) -> None:
+    """Обслуживает уже открытый сокет до остановки процесса."""
+    wiki = FakeWiki(SyntheticCategory(size), faults, seed)
+    web.run_app(
+        wiki.app(),
+        sock=sock,
+        print=None,
+        access_log=None,
+        handle_signals=True,
+    )
+
+
+def add_fault_arguments(parser: argparse.ArgumentParser) -> None:
+    """Флаги --latency, --error-rate и т. д. по полям FaultConfig."""
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    for field, default in FaultConfig._field_defaults.items():
+        parser.add_argument(
+            f"--{field.replace('_', '-')}", type=float, default=default
+        )
+
+
+def faults_from_args(args: argparse.Namespace) -> FaultConfig:
+    return FaultConfig(
+        **{field: getattr(args, field) for field in FaultConfig._fields}
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+    faults = faults_from_args(args)
+    sock = socket.create_server((args.host, args.port))
+    print(f"http://{args.host}:{args.port}{API_ENDPOINT}")
+    serve(sock, args.size, faults, args.seed)
+
+
+if __name__ == "__main__":
+    main()
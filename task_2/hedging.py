@@ -0,0 +1,101 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, NamedTuple, TypeVar
+
+T = TypeVar("T")
+
+
+class HedgeStats(NamedTuple):
+    requests: int
+    hedges: int
+    hedge_wins: int
+    delay: float | None
+
+
+class HedgePolicy:
+    """
+    Когда дублировать медленный запрос.
+
+    Задержка хеджа — percentile из последних window наблюдённых времён
+    ответа (не раньше чем после min_samples наблюдений и не меньше
+    min_delay). Доля хеджей ограничена max_ratio от всех запросов,
+    чтобы при общей деградации сервера не удваивать нагрузку.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        max_ratio: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20,
+        min_delay: float = 0.0,
+    ):
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._requests = self._hedges = self._hedge_wins = 0
+
+    def observe(self, latency: float) -> None:
+        self._latencies.append(latency)
+
+    def delay(self) -> float | None:
+        """Через сколько секунд дублировать запрос; None — не дублировать."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+    def allow(self) -> bool:
+        return self._hedges < self.max_ratio * self._requests
+
+    def stats(self) -> HedgeStats:
+        return HedgeStats(
+            requests=self._requests,
+            hedges=self._hedges,
+            hedge_wins=self._hedge_wins,
+            delay=self.delay(),
+        )
+
+    async def _timed(self, send: Callable[[], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        result = await send()
+        self.observe(time.monotonic() - started)
+        return result
+
+    async def run(self, send: Callable[[], Awaitable[T]]) -> T:
+        """
+        Выполняет send(), при задержке дольше delay() запускает дубликат
+        и возвращает первый успешный ответ; оставшийся отменяется. Если
+        оба завершились ошибкой, выбрасывается ошибка основного.
+        """
+        self._requests += 1
+        tasks = [asyncio.ensure_future(self._timed(send))]
+        try:
+            delay = self.delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.allow():
+                    self._hedges += 1
+                    tasks.append(asyncio.ensure_future(self._timed(send)))
+            return await self._first_success(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _first_success(self, tasks: list[asyncio.Future]) -> T:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    self._hedge_wins += task is not tasks[0]
+                    return task.result()
+        return tasks[0].result()
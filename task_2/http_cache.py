@@ -0,0 +1,218 @@
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Any, Awaitable, Callable, Mapping, NamedTuple
+
+NOT_MODIFIED = 304
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+
+class CacheEntry(NamedTuple):
+    data: Any
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    revalidated: int
+    misses: int
+    evictions: int
+    entries: int
+    size: int
+
+
+class Fetched(NamedTuple):
+    """Ответ сервера: статус, JSON (None при 304) и валидаторы кеша."""
+
+    status: int
+    data: Any
+    etag: str | None = None
+    last_modified: str | None = None
+
+
+def make_key(
+    method: str, endpoint: str, params: Mapping[str, Any] | None = None
+) -> str:
+    """Ключ кеша: метод, путь и параметры без учёта их порядка."""
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    raw = json.dumps([method.upper(), endpoint, items], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(fetched: Fetched) -> bool:
+    """
+    Кешируется только успешный ответ с данными query: ошибка MediaWiki
+    ({"error": ...}) приходит со статусом 200 и не должна жить весь TTL.
+    """
+    data = fetched.data
+    return (
+        fetched.status == 200
+        and isinstance(data, dict)
+        and "query" in data
+        and "error" not in data
+    )
+
+
+def conditional_headers(entry: CacheEntry | None) -> dict[str, str]:
+    """Заголовки условного запроса по валидаторам записи."""
+    headers = {}
+    if entry is not None and entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry is not None and entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers
+
+
+class ResponseCache:
+    """
+    Персистентный кеш JSON-ответов в SQLite.
+
+    Запись моложе ttl секунд отдаётся без обращения к серверу, более
+    старая перепроверяется условным запросом (If-None-Match /
+    If-Modified-Since), если сервер прислал ETag или Last-Modified.
+    Суммарный размер тел ограничен max_bytes, при переполнении
+    вытесняются давно не читавшиеся записи (LRU).
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        ttl: float = DEFAULT_TTL,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._db = sqlite3.connect(path)
+        self._db.execute(_SCHEMA)
+        self._hits = self._revalidated = self._misses = self._evictions = 0
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get(self, key: str) -> CacheEntry | None:
+        row = self._db.execute(
+            "SELECT body, etag, last_modified, stored_at FROM responses "
+            "WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        with self._db:
+            self._db.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (self._clock(), key),
+            )
+        body, etag, last_modified, stored_at = row
+        return CacheEntry(json.loads(body), etag, last_modified, stored_at)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return self._clock() - entry.stored_at < self.ttl
+
+    def put(
+        self,
+        key: str,
+        data: Any,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> None:
+        body = json.dumps(data, ensure_ascii=False)
+        now = self._clock()
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, body, etag, last_modified, now, now, len(body)),
+            )
+            self._evict()
+
+    def refresh(self, key: str) -> None:
+        """Продлевает жизнь записи после ответа 304 Not Modified."""
+        now = self._clock()
+        with self._db:
+            self._db.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? "
+                "WHERE key = ?",
+                (now, now, key),
+            )
+
+    def _evict(self) -> None:
+        total = self._size()
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self._evictions += 1
+
+    def _size(self) -> int:
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    def stats(self) -> CacheStats:
+        entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()
+        return CacheStats(
+            hits=self._hits,
+            revalidated=self._revalidated,
+            misses=self._misses,
+            evictions=self._evictions,
+            entries=entries[0],
+            size=self._size(),
+        )
+
+    async def fetch(
+        self,
+        key: str,
+        send: Callable[[dict[str, str]], Awaitable[Fetched]],
+    ) -> Any:
+        """
+        Отдаёт ответ из кеша или через send(headers).
+
+        send получает условные заголовки и возвращает Fetched; ответ 304
+        продлевает запись, успешный ответ с query (см. is_cacheable) её
+        перезаписывает. Прочие ответы, как и 304 без записи, отдаются
+        без сохранения.
+        """
+        entry = self.get(key)
+        if entry is not None and self.is_fresh(entry):
+            self._hits += 1
+            return entry.data
+
+        fetched = await send(conditional_headers(entry))
+        if fetched.status == NOT_MODIFIED and entry is not None:
+            self._revalidated += 1
+            self.refresh(key)
+            return entry.data
+
+        self._misses += 1
+        if is_cacheable(fetched):
+            self.put(key, fetched.data, fetched.etag, fetched.last_modified)
+        return fetched.data
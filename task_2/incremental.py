@@ -0,0 +1,295 @@
+import json
+import logging
+import os
+import re
+from asyncio import Semaphore
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, NamedTuple
+
+from api_client import APIClient
+from crawler import API_ENDPOINT, PAGE_LIMIT
+from metrics import acquire
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+logger = logging.getLogger("incremental")
+
+# Сколько MediaWiki хранит recentchanges ($wgRCMaxAge, по умолчанию 90
+# дней; в Википедии — 30). Более старый водяной знак — только полный
+# пересчёт.
+RC_MAX_AGE = timedelta(days=30)
+
+# Автокомментарии событий categorize (en/ru). Сообщения о пачке страниц
+# («[[:X]] и ещё 3 страницы добавлены...») сюда не подходят: по ним нельзя
+# восстановить, какие именно страницы изменились.
+_CHANGE = re.compile(
+    r"^\[\[:?(?P<title>[^\]|]+)(?:\|[^\]]*)?\]\]\s+"
+    r"(?:(?P<added>added to category|добавлена в категорию)"
+    r"|(?P<removed>removed from category|удалена из категории))"
+)
+# Статьи считаются только из основного пространства имён. Событие
+# categorize относится к самой категории (её ns — 14), поэтому
+# пространство имён страницы определяется по префиксу её заголовка
+# и таблице пространств имён вики.
+MAIN_NAMESPACE = 0
+NAMESPACES_PARAMS = {
+    "action": "query",
+    "meta": "siteinfo",
+    "siprop": "namespaces|namespacealiases",
+    "format": "json",
+}
+
+
+class DeltaUnavailable(Exception):
+    """Изменения нельзя применить инкрементально — нужен полный пересчёт."""
+
+
+class RecountState(NamedTuple):
+    """
+    Итог прошлого подсчёта: счётчики по буквам, водяной знак (время
+    сервера, с которого читать изменения) и последний учтённый rcid.
+    """
+
+    category: str
+    watermark: str
+    last_rcid: int
+    counts: dict[str, int]
+
+
+def load_state(path: str) -> RecountState | None:
+    try:
+        with open(path, encoding="utf-8") as file:
+            return RecountState(**json.load(file))
+    except FileNotFoundError:
+        return None
+
+
+def save_state(path: str, state: RecountState) -> None:
+    """Атомарно сохраняет состояние (запись во временный файл и rename)."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(state._asdict(), file, ensure_ascii=False, indent=2)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+def parse_timestamp(value: str) -> datetime:
+    return datetime.strptime(value, "%Y-%m-%dT%H:%M:%SZ").replace(
+        tzinfo=timezone.utc
+    )
+
+
+def namespace_ids(response: dict[str, Any]) -> dict[str, int]:
+    """
+    Номера пространств имён по названию (локальному, каноническому и
+    псевдонимам) в нижнем регистре из ответа meta=siteinfo.
+    """
+    query = response["query"]
+    ids = {}
+    for namespace in query["namespaces"].values():
+        for name in (namespace.get("*"), namespace.get("canonical")):
+            if name:
+                ids[name.casefold()] = namespace["id"]
+    for alias in query.get("namespacealiases", []):
+        ids[alias["*"].casefold()] = alias["id"]
+    return ids
+
+
+def title_namespace(title: str, namespaces: dict[str, int]) -> int:
+    prefix, colon, _ = title.partition(":")
+    if not colon:
+        return MAIN_NAMESPACE
+    name = prefix.replace("_", " ").strip().casefold()
+    return namespaces.get(name, MAIN_NAMESPACE)
+
+
+def parse_change(
+    change: dict[str, Any], namespaces: dict[str, int]
+) -> tuple[str, int] | None:
+    """
+    Заголовок статьи и знак изменения (+1/-1) для события categorize;
+    None — событие не касается статей.
+    """
+    match = _CHANGE.match(change.get("comment", ""))
+    if match is None:
+        raise DeltaUnavailable(f"Неразборчивое событие: {change}")
+    title = match["title"]
+    if title_namespace(title, namespaces) != MAIN_NAMESPACE:
+        return None
+    return title, 1 if match["added"] else -1
+
+
+def changes_params(
+    category: str, start: str | None, continue_token: str | None = None
+) -> dict[str, str]:
+    params = {
+        "action": "query",
+        "list": "recentchanges",
+        "rctype": "categorize",
+        "rctitle": category,
+        "rcprop": "title|timestamp|comment|ids",
+        "rclimit": PAGE_LIMIT,
+        "format": "json",
+        "curtimestamp": "1",
+    }
+    if start is None:
+        # Только отметка: последнее событие и текущее время сервера.
+        params.update(rcdir="older", rclimit="1")
+    else:
+        params.update(rcdir="newer", rcstart=start)
+    if continue_token:
+        params["rccontinue"] = continue_token
+    return params
+
+
+async def fetch_marker(
+    client: APIClient, category: str, semaphore: Semaphore
+) -> tuple[str, int]:
+    """Текущее время сервера и rcid последнего события категории."""
+    async with acquire(semaphore, client.metrics):
+        response = await client.request(
+            "GET",
+            API_ENDPOINT,
+            use_cache=False,
+            params=changes_params(category, None),
+        )
+    changes = response["query"]["recentchanges"]
+    return response["curtimestamp"], changes[0]["rcid"] if changes else 0
+
+
+async def fetch_namespaces(
+    client: APIClient, semaphore: Semaphore
+) -> dict[str, int]:
+    """Таблица пространств имён вики (меняется редко, допускает кеш)."""
+    async with acquire(semaphore, client.metrics):
+        response = await client.request(
+            "GET", API_ENDPOINT, params=NAMESPACES_PARAMS
+        )
+    return namespace_ids(response)
+
+
+def apply_changes(
+    changes: list[dict[str, Any]],
+    last_rcid: int,
+    key: Callable[[str], str],
+    delta: Counter,
+    namespaces: dict[str, int],
+) -> int:
+    """Добавляет в delta события новее last_rcid; возвращает новый rcid."""
+    newest = last_rcid
+    for change in changes:
+        if change["rcid"] <= last_rcid:
+            continue
+        parsed = parse_change(change, namespaces)
+        if parsed is not None:
+            title, sign = parsed
+            delta[key(title)] += sign
+        newest = max(newest, change["rcid"])
+    return newest
+
+
+async def fetch_deltas(
+    client: APIClient,
+    state: RecountState,
+    key: Callable[[str], str],
+    semaphore: Semaphore,
+) -> RecountState:
+    """
+    Применяет к state изменения состава категории с его водяного знака.
+
+    Новый водяной знак — время сервера на момент первого запроса; события,
+    попавшие в выдачу позже него, отсекаются в следующий раз по rcid.
+    """
+    namespaces = await fetch_namespaces(client, semaphore)
+    delta: Counter = Counter()
+    watermark, last_rcid = None, state.last_rcid
+    continue_token = None
+    while True:
+        params = changes_params(state.category, state.watermark, continue_token)
+        async with acquire(semaphore, client.metrics):
+            response = await client.request(
+                "GET", API_ENDPOINT, use_cache=False, params=params
+            )
+        watermark = watermark or response["curtimestamp"]
+
+        last_rcid = max(
+            last_rcid,
+            apply_changes(
+                response["query"]["recentchanges"],
+                state.last_rcid,
+                key,
+                delta,
+                namespaces,
+            ),
+        )
+
+        continue_token = response.get("continue", {}).get("rccontinue")
+        if not continue_token:
+            break
+
+    counts = Counter(state.counts)
+    counts.update(delta)
+    if any(value < 0 for value in counts.values()):
+        raise DeltaUnavailable(f"Отрицательные счётчики после {dict(delta)}")
+    logger.info(f"Изменения с {state.watermark}: {dict(delta)}")
+    return RecountState(state.category, watermark, last_rcid, dict(counts))
+
+
+def full_recount_reason(
+    state: RecountState | None, category: str, full: bool, now: datetime
+) -> str | None:
+    """Почему нельзя пересчитать по изменениям; None — можно."""
+    if full:
+        return "запрошен полный пересчёт"
+    if state is None or state.category != category:
+        return "нет сохранённого состояния"
+    if now - parse_timestamp(state.watermark) > RC_MAX_AGE:
+        return "история изменений уже недоступна"
+    return None
+
+
+async def recount(
+    client: APIClient,
+    category: str,
+    path: str,
+    full_count: Callable[[], Awaitable[dict[str, int]]],
+    key: Callable[[str], str],
+    semaphore: Semaphore,
+    full: bool = False,
+    now: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+) -> dict[str, int]:
+    """
+    Обновляет счётчики категории по изменениям или полным пересчётом.
+
+    Полный пересчёт (full_count) выполняется по требованию (full), при
+    отсутствии сохранённого состояния, при водяном знаке старше
+    RC_MAX_AGE и если изменения нельзя применить (DeltaUnavailable).
+    Отметка (время сервера и последний rcid) берётся после полного
+    пересчёта: события, пришедшие во время обхода, считаются учтёнными
+    им и следующим запуском повторно не применяются.
+
+    Изменения и отметка всегда запрашиваются мимо кеша клиента; full_count
+    тоже должен обходить категорию без кеша, иначе счётчики окажутся
+    старше сохранённого водяного знака.
+    """
+    state = load_state(path)
+    reason = full_recount_reason(state, category, full, now())
+    if reason is None:
+        try:
+            state = await fetch_deltas(client, state, key, semaphore)
+        except DeltaUnavailable as e:
+            reason = str(e)
+
+    if reason is not None:
+        logger.info(f"Полный пересчёт: {reason}")
+        counts = await full_count()
+        watermark, last_rcid = await fetch_marker(client, category, semaphore)
+        state = RecountState(category, watermark, last_rcid, dict(counts))
+
+    save_state(path, state)
+    return state.counts
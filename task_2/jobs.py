@@ -0,0 +1,355 @@
+# python jobs.py "Категория:Кошачьи" "Категория:Псовые" --depth 2 --output out.jsonl
+"""
+Обход произвольного набора категорий и их деревьев подкатегорий.
+
+Все обходы идут через один APIClient (а значит, общий пул соединений,
+ограничители нагрузки и кеш) и общий семафор. Каждая категория
+загружается один раз, даже если она встречается в нескольких деревьях
+или у нескольких родителей; результаты отдаются по мере готовности.
+Ошибка одного задания не останавливает остальные: она возвращается
+в его результате.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from asyncio import Semaphore
+from collections import Counter
+from functools import partial
+from typing import AsyncIterator, Callable, Iterable, NamedTuple
+
+from api_client import APIClient
+from crawler import (
+    DEFAULT_QUEUE_SIZE,
+    SUBCATEGORIES,
+    Partition,
+    crawl,
+    iter_partition_pages,
+    make_partitions,
+)
+from http_cache import DEFAULT_TTL, ResponseCache
+from wiki import (
+    MAX_CONCURRENT_REQUESTS,
+    log_client_stats,
+    make_client,
+    normalize_first_char,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+logger = logging.getLogger("jobs")
+
+
+class CategorySpec(NamedTuple):
+    """
+    Задание на обход: категория, глубина спуска по подкатегориям
+    (0 — только сама категория), границы диапазонов для параллельной
+    загрузки корня (см. crawler.make_partitions) и нужен ли список
+    заголовков в результате.
+    """
+
+    title: str
+    depth: int = 0
+    boundaries: str = ""
+    members: bool = False
+
+
+class CategoryResult(NamedTuple):
+    """Итог задания; error — текст ошибки, если обход не удался."""
+
+    spec: CategorySpec
+    categories: int
+    total: int
+    counts: dict[str, int] | None
+    members: list[str] | None
+    error: str | None = None
+
+
+class _SharedLoad:
+    """Общая загрузка категории и задания, уже получившие её результат."""
+
+    __slots__ = ("task", "users")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.users: set[object] = set()
+
+
+class JobRunner:
+    """
+    Планировщик обходов категорий поверх общего клиента.
+
+    Загрузка каждой категории (статьи и подкатегории) выполняется одной
+    задачей, которую разделяют все задания; статьи, попавшие в дерево
+    через нескольких родителей, учитываются в результате один раз. С
+    key результат содержит счётчики key(title), например по первой
+    букве.
+
+    Результат загрузки хранится, пока он может понадобиться ещё не
+    завершённому заданию, которое его не получало; упавшая загрузка
+    сразу забывается, и следующее обращение повторяет её.
+    """
+
+    def __init__(
+        self,
+        client: APIClient,
+        semaphore: Semaphore,
+        key: Callable[[str], str] | None = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+    ):
+        self.client = client
+        self.semaphore = semaphore
+        self.key = key
+        self.queue_size = queue_size
+        self._pages: dict[str, _SharedLoad] = {}
+        self._subcategories: dict[str, _SharedLoad] = {}
+        self._running: set[object] = set()
+
+    def _shared(
+        self, loads: dict[str, _SharedLoad], category: str, coro_factory
+    ) -> asyncio.Task:
+        if category not in loads:
+            load = _SharedLoad(asyncio.create_task(coro_factory()))
+            load.task.add_done_callback(
+                partial(self._forget_failed, loads, category)
+            )
+            loads[category] = load
+        return loads[category].task
+
+    @staticmethod
+    def _forget_failed(
+        loads: dict[str, _SharedLoad], category: str, task: asyncio.Task
+    ) -> None:
+        if not task.cancelled() and task.exception() is None:
+            return
+        load = loads.get(category)
+        if load is not None and load.task is task:
+            del loads[category]
+
+    def _release(
+        self, loads: dict[str, _SharedLoad], categories: Iterable[str]
+    ) -> None:
+        """Забывает загрузки, которые не нужны ни одному идущему заданию."""
+        for category in list(categories):
+            load = loads.get(category)
+            if load is not None and self._running <= load.users:
+                del loads[category]
+                load.task.cancel()  # завершённой задаче отмена не вредит
+
+    def _consume(
+        self, loads: dict[str, _SharedLoad], categories: list[str], job: object
+    ) -> None:
+        for category in categories:
+            if category in loads:
+                loads[category].users.add(job)
+        self._release(loads, categories)
+
+    def _finish(self, job: object) -> None:
+        self._running.discard(job)
+        for loads in (self._pages, self._subcategories):
+            for load in loads.values():
+                load.users.discard(job)
+            self._release(loads, loads)
+
+    def pages(self, category: str, boundaries: str = "") -> asyncio.Task:
+        """Задача загрузки заголовков статей категории."""
+        return self._shared(
+            self._pages,
+            category,
+            lambda: self._fetch_pages(category, make_partitions(boundaries)),
+        )
+
+    def subcategories(self, category: str) -> asyncio.Task:
+        """Задача загрузки подкатегорий категории."""
+        return self._shared(
+            self._subcategories,
+            category,
+            lambda: self._fetch_subcategories(category),
+        )
+
+    async def _fetch_pages(
+        self, category: str, partitions: list[Partition]
+    ) -> list[str]:
+        titles = []
+        async for page in crawl(
+            self.client,
+            category,
+            partitions,
+            self.semaphore,
+            queue_size=self.queue_size,
+        ):
+            titles.extend(m["title"] for m in page.members)
+        logger.info(f"[{category}] статей: {len(titles)}")
+        return titles
+
+    async def _fetch_subcategories(self, category: str) -> list[str]:
+        titles = []
+        async for page in iter_partition_pages(
+            self.client,
+            category,
+            Partition(None, None),
+            self.semaphore,
+            member_type=SUBCATEGORIES,
+        ):
+            titles.extend(m["title"] for m in page.members)
+        return titles
+
+    async def run_spec(self, spec: CategorySpec) -> CategoryResult:
+        """Обходит дерево категории в ширину до spec.depth."""
+        job = object()
+        self._running.add(job)
+        try:
+            return await self._walk(spec, job)
+        finally:
+            self._finish(job)
+
+    async def _walk(self, spec: CategorySpec, job: object) -> CategoryResult:
+        seen = {spec.title}
+        frontier = [spec.title]
+        titles: set[str] = set()
+        for level in range(spec.depth + 1):
+            page_tasks = [
+                self.pages(c, spec.boundaries if c == spec.title else "")
+                for c in frontier
+            ]
+            subcategory_tasks = (
+                [self.subcategories(c) for c in frontier]
+                if level < spec.depth
+                else []
+            )
+            # shield: отмена одного задания не отменяет общую загрузку.
+            for members in await asyncio.gather(
+                *map(asyncio.shield, page_tasks)
+            ):
+                titles.update(members)
+            self._consume(self._pages, frontier, job)
+            children = await asyncio.gather(
+                *map(asyncio.shield, subcategory_tasks)
+            )
+            self._consume(self._subcategories, frontier, job)
+            frontier = [
+                child
+                for child in dict.fromkeys(c for cs in children for c in cs)
+                if child not in seen
+            ]
+            seen.update(frontier)
+            if not frontier:
+                break
+
+        counts = Counter(map(self.key, titles)) if self.key else None
+        return CategoryResult(
+            spec=spec,
+            categories=len(seen),
+            total=len(titles),
+            counts=dict(sorted(counts.items())) if counts is not None else None,
+            members=sorted(titles) if spec.members else None,
+        )
+
+    async def _run_checked(self, spec: CategorySpec) -> CategoryResult:
+        try:
+            return await self.run_spec(spec)
+        except Exception as e:
+            logger.error(f"[{spec.title}] обход не удался: {e!r}")
+            return CategoryResult(spec, 0, 0, None, None, error=repr(e))
+
+    async def run(
+        self, specs: Iterable[CategorySpec]
+    ) -> AsyncIterator[CategoryResult]:
+        """
+        Запускает все задания и отдаёт результаты по мере готовности;
+        упавшее задание отдаётся с заполненным error.
+        """
+        tasks = [asyncio.create_task(self._run_checked(spec)) for spec in specs]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            pending = [
+                *tasks,
+                *(load.task for load in self._pages.values()),
+                *(load.task for load in self._subcategories.values()),
+            ]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def main(
+    specs: list[CategorySpec],
+    output: str | None = None,
+    hedge: bool = False,
+    cache_path: str | None = None,
+    cache_ttl: float = DEFAULT_TTL,
+) -> None:
+    """
+    Выполняет задания и пишет результаты в output построчно (JSON Lines).
+    С cache_path все задания делят один ResponseCache.
+    """
+    cache = ResponseCache(cache_path, ttl=cache_ttl) if cache_path else None
+    out = open(output, "w", encoding="utf-8") if output else sys.stdout
+    try:
+        async with make_client(cache, hedge=hedge) as client:
+            runner = JobRunner(
+                client,
+                Semaphore(MAX_CONCURRENT_REQUESTS),
+                key=normalize_first_char,
+            )
+            async for result in runner.run(specs):
+                record = {
+                    "category": result.spec.title,
+                    "depth": result.spec.depth,
+                    "categories": result.categories,
+                    "total": result.total,
+                    "counts": result.counts,
+                    "members": result.members,
+                    "error": result.error,
+                }
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+            log_client_stats(client)
+    finally:
+        if cache is not None:
+            cache.close()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("categories", nargs="+", help="названия категорий")
+    parser.add_argument(
+        "--depth", type=int, default=0, help="глубина подкатегорий"
+    )
+    parser.add_argument(
+        "--members", action="store_true", help="выводить списки заголовков"
+    )
+    parser.add_argument(
+        "--output", help="файл JSON Lines (по умолчанию stdout)"
+    )
+    parser.add_argument("--hedge", action="store_true")
+    parser.add_argument(
+        "--cache", help="файл кеша ответов API, общего для всех заданий"
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help="сколько секунд ответ считается свежим без перепроверки",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            [
+                CategorySpec(title, args.depth, members=args.members)
+                for title in args.categories
+            ],
+            args.output,
+            args.hedge,
+            args.cache,
+            args.cache_ttl,
+        )
+    )
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, NamedTuple, Protocol
+
+
+class Limiter(Protocol):
+    """
+    Ограничитель числа одновременных запросов.
+
+    acquire ждёт свободного слота и возвращает отметку начала запроса,
+    release освобождает слот и сообщает, был ли запрос отклонён
+    сервером из-за перегрузки (429, 5xx, таймаут, обрыв соединения).
+    """
+
+    async def acquire(self) -> float:
+        """Ждёт слот и возвращает отметку начала запроса."""
+
+    def release(self, started: float, dropped: bool = False) -> None:
+        """Освобождает слот и сообщает исход запроса."""
+
+
+class LimiterStats(NamedTuple):
+    limit: float
+    in_flight: int
+    successes: int
+    drops: int
+    increases: int
+    decreases: int
+
+
+class _Slots(ABC):
+    """Очередь ожидания слотов с изменяемым лимитом (FIFO)."""
+
+    def __init__(self, clock: Callable[[], float]):
+        self._clock = clock
+        self._waiters: deque[asyncio.Future] = deque()
+        self.in_flight = 0
+
+    @abstractmethod
+    def capacity(self) -> int:
+        """Сколько запросов может выполняться одновременно сейчас."""
+
+    async def acquire(self) -> float:
+        if not self._waiters and self.in_flight < self.capacity():
+            self.in_flight += 1
+            return self._clock()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Слот уже был передан, но задача отменена — возвращаем его.
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            raise
+        return self._clock()
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < self.capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+
+class StaticLimiter(_Slots):
+    """Фиксированный лимит, аналог Semaphore(limit)."""
+
+    def __init__(self, limit: int, clock: Callable[[], float] = time.monotonic):
+        super().__init__(clock)
+        self.limit = limit
+
+    def capacity(self) -> int:
+        return self.limit
+
+    def release(self, started: float, dropped: bool = False) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+
+class AIMDLimiter(_Slots):
+    """
+    Адаптивный лимит: аддитивный рост, мультипликативное снижение.
+
+    Пока задержка не превышает базовую (минимальную наблюдённую) больше
+    чем в latency_tolerance раз и лимит действительно выбран, каждый
+    успешный ответ добавляет increase / limit — около increase за
+    «круг» запросов. Отказ сервера или рост задержки умножает лимит на
+    decrease, но не чаще раза на волну: запросы, начатые до последнего
+    снижения, повторно его не вызывают. Лимит держится в пределах
+    [min_limit, max_limit].
+    """
+
+    def __init__(
+        self,
+        initial: float = 4,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: float = 2.0,
+        baseline_drift: float = 0.001,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__(clock)
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.baseline_drift = baseline_drift
+        self._baseline: float | None = None
+        self._decreased_at = float("-inf")
+        self._successes = self._drops = 0
+        self._increases = self._decreases = 0
+
+    def capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    def release(self, started: float, dropped: bool = False) -> None:
+        utilized = self.in_flight >= self.capacity()
+        self.in_flight -= 1
+        latency = self._clock() - started
+
+        if dropped:
+            self._drops += 1
+            self._backoff(started)
+        else:
+            self._successes += 1
+            if self._congested(latency):
+                self._backoff(started)
+            elif utilized:
+                self.limit = min(
+                    self.max_limit, self.limit + self.increase / self.limit
+                )
+                self._increases += 1
+        self._wake()
+
+    def _congested(self, latency: float) -> bool:
+        # Базовая задержка медленно «всплывает», чтобы не застрять на
+        # случайно быстром ответе.
+        if self._baseline is None:
+            self._baseline = latency
+        else:
+            self._baseline = min(
+                latency, self._baseline * (1 + self.baseline_drift)
+            )
+        return latency > self._baseline * self.latency_tolerance
+
+    def _backoff(self, started: float) -> None:
+        if started < self._decreased_at:
+            return
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+        self._decreased_at = self._clock()
+        self._decreases += 1
+
+    def stats(self) -> LimiterStats:
+        return LimiterStats(
+            limit=round(self.limit, 2),
+            in_flight=self.in_flight,
+            successes=self._successes,
+            drops=self._drops,
+            increases=self._increases,
+            decreases=self._decreases,
+        )
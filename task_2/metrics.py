@@ -0,0 +1,259 @@
+import bisect
+import time
+from asyncio import Semaphore
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Mapping, TypeVar
+
+T = TypeVar("T")
+
+# Ожидания ограничителей нагрузки, которые учитываются отдельно от
+# семафора: общий TokenBucket, Limiter/AIMDLimiter клиента и
+# CircuitBreaker(wait=True), пока цепь разомкнута.
+RATE_LIMITER = "rate_limiter"
+LIMITER = "limiter"
+BREAKER = "breaker"
+WAITS = (RATE_LIMITER, LIMITER, BREAKER)
+
+# Поля статистики клиента, которые при сводке процессов не складываются:
+# задержка хеджирования у каждого процесса своя.
+MAX_CLIENT_FIELDS = frozenset({"delay"})
+
+# Границы корзин гистограммы задержек, секунды.
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами: счётчики на корзину, сумма,
+    максимум. Квантиль оценивается верхней границей корзины, в которую
+    он попал (для последней, открытой корзины — максимумом).
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max), 6)
+        return round(self.max, 6)
+
+    def merge(self, other: "Histogram") -> None:
+        """Добавляет наблюдения other (с теми же корзинами)."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "max": round(self.max, 6),
+            "buckets": {
+                **{
+                    f"le_{bound:g}": count
+                    for bound, count in zip(self.buckets, self.counts)
+                },
+                "le_inf": self.counts[-1],
+            },
+        }
+
+
+def request_label(endpoint: str, params: Mapping[str, str] | None) -> str:
+    """
+    Метка запроса для метрик: у MediaWiki один адрес, поэтому к нему
+    добавляется модуль запроса (list или action).
+    """
+    params = params or {}
+    module = params.get("list") or params.get("action")
+    return f"{endpoint}:{module}" if module else endpoint
+
+
+def _merge_field(field: str, total: Any, value: Any) -> Any:
+    if total is None or value is None:
+        return value if total is None else total
+    if field in MAX_CLIENT_FIELDS:
+        return max(total, value)
+    return total + value
+
+
+def merge_client_stats(
+    stats: list[dict[str, dict[str, Any]]],
+) -> dict[str, dict[str, Any]]:
+    """
+    Сводит статистику клиентов нескольких процессов (APIClient.stats):
+    счётчики и лимиты складываются в общие на все процессы,
+    peak_in_flight — в верхнюю оценку.
+    """
+    total: dict[str, dict[str, Any]] = {}
+    for item in stats:
+        for name, fields in item.items():
+            merged = total.setdefault(name, dict.fromkeys(fields))
+            for field, value in fields.items():
+                merged[field] = _merge_field(field, merged[field], value)
+    return total
+
+
+class Metrics:
+    """
+    Метрики одного запуска обхода.
+
+    Клиент сообщает о каждой HTTP-попытке (observe_request) и ожидании
+    ограничителей (timed), backoff — о повторах и паузах (observe_retry)
+    и ожидании CircuitBreaker, обходчик — о страницах диапазонов
+    (observe_page) и ожидании семафора (acquire). report() сводит всё в
+    словарь для JSON-отчёта: куда ушло время запуска.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.started = clock()
+        self.latency: dict[str, Histogram] = defaultdict(Histogram)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.bytes: Counter = Counter()
+        self.retries: Counter = Counter()
+        self.backoff_sleep = 0.0
+        self.semaphore_wait = Histogram()
+        self.waits = {kind: Histogram() for kind in WAITS}
+        self.pages: Counter = Counter()
+        self.members: Counter = Counter()
+        # Итоговая статистика клиентов процессов-шардов (APIClient.stats).
+        self.clients: list[dict[str, dict[str, Any]]] = []
+
+    def observe_request(
+        self, label: str, status: int | str, latency: float, size: int
+    ) -> None:
+        """status — код ответа или имя класса исключения."""
+        self.latency[label].observe(latency)
+        self.statuses[label][str(status)] += 1
+        self.bytes[label] += size
+
+    def observe_retry(self, error: BaseException, delay: float) -> None:
+        self.retries[type(error).__name__] += 1
+        self.backoff_sleep += delay
+
+    def observe_wait(self, kind: str, seconds: float) -> None:
+        """kind — один из WAITS."""
+        self.waits[kind].observe(seconds)
+
+    def observe_page(self, partition: str, members: int) -> None:
+        self.pages[partition] += 1
+        self.members[partition] += members
+
+    def merge(self, other: "Metrics") -> None:
+        """Добавляет метрики другого процесса (см. sharded.py)."""
+        for label, histogram in other.latency.items():
+            self.latency[label].merge(histogram)
+            self.statuses[label].update(other.statuses[label])
+        self.bytes.update(other.bytes)
+        self.retries.update(other.retries)
+        self.backoff_sleep += other.backoff_sleep
+        self.semaphore_wait.merge(other.semaphore_wait)
+        for kind, histogram in other.waits.items():
+            self.waits[kind].merge(histogram)
+        self.pages.update(other.pages)
+        self.members.update(other.members)
+        self.clients.extend(other.clients)
+
+    @asynccontextmanager
+    async def acquire(self, semaphore: Semaphore) -> AsyncIterator[None]:
+        """Занимает семафор, учитывая время ожидания слота."""
+        waiting = self._clock()
+        async with semaphore:
+            self.semaphore_wait.observe(self._clock() - waiting)
+            yield
+
+    async def timed(self, kind: str, awaitable: Awaitable[T]) -> T:
+        """Ждёт awaitable, учитывая время ожидания в waits[kind]."""
+        waiting = self._clock()
+        try:
+            return await awaitable
+        finally:
+            self.observe_wait(kind, self._clock() - waiting)
+
+    def report(self, **extra: Any) -> dict[str, Any]:
+        """Сводка запуска; extra добавляется в отчёт как есть."""
+        return {
+            "wall_time": round(self._clock() - self.started, 6),
+            "requests": {
+                label: {
+                    "statuses": dict(self.statuses[label]),
+                    "bytes": self.bytes[label],
+                    "latency": histogram.snapshot(),
+                }
+                for label, histogram in sorted(self.latency.items())
+            },
+            "request_time": round(sum(h.sum for h in self.latency.values()), 6),
+            "bytes": sum(self.bytes.values()),
+            "retries": dict(self.retries),
+            "backoff_sleep": round(self.backoff_sleep, 6),
+            "semaphore_wait": self.semaphore_wait.snapshot(),
+            "waits": {
+                kind: histogram.snapshot()
+                for kind, histogram in self.waits.items()
+            },
+            "partitions": {
+                partition: {
+                    "pages": pages,
+                    "members": self.members[partition],
+                }
+                for partition, pages in sorted(self.pages.items())
+            },
+            **extra,
+        }
+
+
+@asynccontextmanager
+async def acquire(
+    semaphore: Semaphore, metrics: Metrics | None
+) -> AsyncIterator[None]:
+    """Семафор с учётом ожидания в metrics, если они заданы."""
+    if metrics is None:
+        async with semaphore:
+            yield
+    else:
+        async with metrics.acquire(semaphore):
+            yield
+
+
+async def timed(
+    awaitable: Awaitable[T], metrics: Metrics | None, kind: str
+) -> T:
+    """Ожидание ограничителя с учётом в metrics, если они заданы."""
+    if metrics is None:
+        return await awaitable
+    return await metrics.timed(kind, awaitable)
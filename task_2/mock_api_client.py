@@ -1,8 +1,110 @@
+from bisect import bisect_left
+from collections.abc import Mapping
+
+from api_client import PoolConfig, PoolStats
+from hedging import HedgePolicy
+from http_cache import ResponseCache
+from limiter import Limiter
+from metrics import Metrics
+from my_backoff import CircuitBreaker, TokenBucket
+from singleflight import SingleFlight
+from wiki import sortkey
+
+DEFAULT_MEMBERS = ("Барсук", "Бегемот", "Буйвол", "Ёж", "Łoś")
+CATEGORY_PREFIX = "Категория:"
+
+
 class MockAPIClient:
-    def __init__(self, base_url: str = None):
-        self._first_request = True
+    """
+    Имитирует list=categorymembers для набора заголовков: учитывает
+    cmstartsortkeyprefix, cmendsortkeyprefix, cmcontinue, cmprop и размер
+    страницы. Все запросы сохраняются в requests.
+
+    Это только транспорт: аргументы APIClient (cache, limiter,
+    rate_limiter, metrics, single_flight и др.) принимаются, чтобы
+    заглушку можно было подставить в make_client, но не используются.
+    Эти возможности проверяются на самом APIClient.
+
+    members — заголовки одной категории (для любого cmtitle) или
+    словарь {категория: заголовки}; заголовки с префиксом «Категория:»
+    отдаются как подкатегории (cmtype=subcat), остальные — как статьи.
+    """
+
+    def __init__(
+        self,
+        base_url: str = None,
+        config: PoolConfig = PoolConfig(),
+        members=DEFAULT_MEMBERS,
+        page_size: int = 2,
+        cache: ResponseCache | None = None,
+        limiter: Limiter | None = None,
+        rate_limiter: TokenBucket | None = None,
+        maxlag: int | None = None,
+        breaker: CircuitBreaker | None = None,
+        hedge: HedgePolicy | None = None,
+        metrics: Metrics | None = None,
+        single_flight: SingleFlight | None = None,
+    ):
         self.base_url = base_url
+        self.config = config
+        # Возможности клиента заглушке не нужны (см. описание класса).
+        self.cache = self.limiter = self.rate_limiter = None
+        self.breaker = self.hedge = self.single_flight = None
+        self.metrics = None
         self.session = None
+        self.page_size = page_size
+        self.categories = (
+            dict(members) if isinstance(members, Mapping) else {None: members}
+        )
+        self._listings: dict[tuple, tuple[list[str], list]] = {}
+        self.requests: list[dict] = []
+
+    @property
+    def request_count(self) -> int:
+        return len(self.requests)
+
+    def pool_stats(self) -> PoolStats:
+        return PoolStats(
+            limit=self.config.limit,
+            limit_per_host=self.config.limit_per_host,
+            new_connections=0,
+            reused_connections=0,
+            queued=0,
+            in_flight=0,
+            peak_in_flight=0,
+        )
+
+    def stats(self) -> dict[str, dict]:
+        return {"pool": self.pool_stats()._asdict()}
+
+    def _listing(self, params) -> tuple[list[str], list]:
+        """Отсортированные заголовки нужного cmtitle/cmtype и их ключи."""
+        category = params.get("cmtitle")
+        if category not in self.categories:
+            category = None
+        subcats = params.get("cmtype") == "subcat"
+        if (category, subcats) not in self._listings:
+            titles = sorted(
+                (
+                    title
+                    for title in self.categories.get(category, ())
+                    if title.startswith(CATEGORY_PREFIX) == subcats
+                ),
+                key=sortkey,
+            )
+            keys = [sortkey(title) for title in titles]
+            self._listings[category, subcats] = titles, keys
+        return self._listings[category, subcats]
+
+    @staticmethod
+    def _member(titles: list[str], index: int, cmprop: str) -> dict:
+        props = cmprop.split("|")
+        member: dict = {}
+        if "ids" in props:
+            member["pageid"] = index + 1
+        if "title" in props:
+            member["title"] = titles[index]
+        return member
 
     async def __aenter__(self):
         return self
@@ -10,46 +112,30 @@ class MockAPIClient:
     async def __aexit__(self, exc_type, exc, tb):
         pass
 
-    async def request(self, method, url, params):
-        letter = params.get("cmstartsortkeyprefix", "")
-
-        if letter == "Б":
-            if self._first_request:
-                self._first_request = False
-                return {
-                    "query": {
-                        "categorymembers": [
-                            {"title": "Барсук", "pageid": 1},
-                            {"title": "Бегемот", "pageid": 2},
-                        ]
-                    },
-                    "continue": {"cmcontinue": "next_batch"},
-                }
-            else:
-                return {
-                    "query": {
-                        "categorymembers": [
-                            {"title": "Буйвол", "pageid": 5},
-                        ]
-                    }
-                }
-
-        elif letter == "Е":
-            return {
-                "query": {
-                    "categorymembers": [
-                        {"title": "Ёж", "pageid": 3},
-                    ]
-                }
-            }
+    async def request(self, method, url, params, use_cache=True):
+        self.requests.append(dict(params))
+        titles, keys = self._listing(params)
 
-        elif letter == "#":
-            return {
-                "query": {
-                    "categorymembers": [
-                        {"title": "Łoś", "pageid": 4},
-                    ]
-                }
-            }
+        if "cmcontinue" in params:
+            start = int(params["cmcontinue"])
+        elif params.get("cmstartsortkeyprefix"):
+            start = bisect_left(keys, sortkey(params["cmstartsortkeyprefix"]))
+        else:
+            start = 0
 
-        return {"query": {"categorymembers": []}}
+        end = len(titles)
+        if params.get("cmendsortkeyprefix"):
+            end = bisect_left(keys, sortkey(params["cmendsortkeyprefix"]))
+
+        stop = min(start + self.page_size, end)
+        response = {
+            "query": {
+                "categorymembers": [
+                    self._member(titles, i, params.get("cmprop", "ids|title"))
+                    for i in range(start, stop)
+                ]
+            }
+        }
+        if stop < end:
+            response["continue"] = {"cmcontinue": str(stop), "continue": "-||"}
+        return response
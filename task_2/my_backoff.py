@@ -5,6 +5,8 @@ import time
 from functools import wraps
 from typing import Any, Callable, Coroutine, Iterable, TypeVar
 
+from metrics import BREAKER, Metrics, timed
+
 RT = TypeVar("RT")
 FuncType = Callable[..., RT | Coroutine[Any, Any, RT]]
 
@@ -16,30 +18,225 @@ logging.basicConfig(
 logger = logging.getLogger("backoff")
 
 
-def sync_sleep_with_jitter(
-    n: int,
-    start_sleep_time: float,
-    factor: int,
-    border_sleep_time: int,
-) -> None:
-    """Выполняет синхронную задержку с экспоненциальным ростом и jitter."""
-    _time = start_sleep_time * (factor**n)
-    t = min(border_sleep_time, _time)
-    jitter = random.uniform(0, t * 0.1)  # Добавление jitter в 10%
-    time.sleep(t + jitter)
+PROPORTIONAL = "proportional"
+FULL = "full"
+DECORRELATED = "decorrelated"
+JITTER_STRATEGIES = (PROPORTIONAL, FULL, DECORRELATED)
 
 
-async def async_sleep_with_jitter(
+def get_sleep_time(
     n: int,
     start_sleep_time: float,
     factor: int,
     border_sleep_time: int,
-) -> None:
-    """Выполняет асинхронную задержку с экспоненциальным ростом и jitter."""
-    _time = start_sleep_time * (factor**n)
-    t = min(border_sleep_time, _time)
-    jitter = random.uniform(0, t * 0.1)  # Добавление jitter в 10%
-    await asyncio.sleep(t + jitter)
+    jitter: str = PROPORTIONAL,
+    previous: float | None = None,
+) -> float:
+    """
+    Время ожидания перед повтором номер n.
+
+    proportional — экспонента плюс до 10% сверху; full — случайное
+    значение от 0 до экспоненты; decorrelated — случайное значение от
+    start_sleep_time до утроенной прошлой задержки (previous). Full и
+    decorrelated разводят повторы одновременно упавших корутин.
+    """
+    t = min(border_sleep_time, start_sleep_time * (factor**n))
+    if jitter == FULL:
+        return random.uniform(0, t)
+    if jitter == DECORRELATED:
+        upper = (previous or start_sleep_time) * 3
+        return min(border_sleep_time, random.uniform(start_sleep_time, upper))
+    return t + random.uniform(0, t * 0.1)  # Добавление jitter в 10%
+
+
+def server_delay(e: Exception) -> float | None:
+    """Задержка, запрошенная сервером (Retry-After, maxlag), если есть."""
+    delay = getattr(e, "retry_after", None)
+    return None if delay is None else max(0.0, float(delay))
+
+
+class TokenBucket:
+    """
+    Общий ограничитель частоты запросов: rate токенов в секунду, не
+    больше capacity подряд.
+
+    Токены резервируются в порядке обращения (счёт может уйти в минус),
+    поэтому ожидающие получают их по очереди, без гонки за каждый
+    освободившийся токен. pause(delay) задерживает всех держателей
+    ведра — так соблюдается Retry-After для всего клиента, а не только
+    для получившей его корутины: ведро пустеет, пополнение начинается
+    с конца паузы, и ожидающие выходят из неё с шагом 1/rate, а не все
+    разом. Проснувшиеся до конца паузы встают в очередь заново.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = float("-inf")
+
+    def _reserve(self) -> float:
+        """Забирает токен и возвращает, сколько секунд ждать его."""
+        now = self._clock()
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    def _paused(self) -> bool:
+        return self._clock() < self._paused_until
+
+    async def acquire(self) -> None:
+        while (wait := self._reserve()) > 0:
+            await asyncio.sleep(wait)
+            if not self._paused():
+                return
+
+    def acquire_sync(self) -> None:
+        while (wait := self._reserve()) > 0:
+            time.sleep(wait)
+            if not self._paused():
+                return
+
+    def pause(self, delay: float) -> None:
+        until = self._clock() + delay
+        if until > self._paused_until:
+            # Отсчёт пополнения переносится на конец паузы: до него
+            # каждый новый резерв уходит в долг за паузой.
+            self._paused_until = self._updated = until
+            self._tokens = 0.0
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, func_name: str, deadline: float):
+        super().__init__(f"{func_name} не уложилась в {deadline} с")
+        self.deadline = deadline
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_in: float):
+        super().__init__(f"Circuit is open, retry in {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Общее для всех вызовов состояние отказов upstream.
+
+    closed — вызовы идут, подряд идущие ошибки считаются; после
+    failure_threshold ошибок цепь размыкается (open) на
+    recovery_timeout секунд. Затем она полуоткрыта (half_open):
+    пропускается один пробный вызов, успех замыкает цепь, ошибка снова
+    размыкает её. Пока цепь не замкнута, вызовы либо сразу получают
+    CircuitOpenError (wait=False), либо ждут (wait=True).
+    on_state_change(old, new) вызывается при каждом переходе.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        wait: bool = False,
+        on_state_change: Callable[[str, str], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.wait = wait
+        self.on_state_change = on_state_change
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._changed: asyncio.Event | None = None
+
+    @property
+    def state(self) -> str:
+        if (
+            self._state == OPEN
+            and self._clock() - self._opened_at >= self.recovery_timeout
+        ):
+            self._transition(HALF_OPEN)
+        return self._state
+
+    @property
+    def failures(self) -> int:
+        return self._failures
+
+    def _transition(self, state: str) -> None:
+        old, self._state = self._state, state
+        if state == OPEN:
+            self._opened_at = self._clock()
+        if state != HALF_OPEN:
+            self._probing = False
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+        logger.info(f"Circuit breaker: {old} -> {state}")
+        if self.on_state_change is not None:
+            self.on_state_change(old, state)
+
+    def _admit(self) -> float | None:
+        """None, если вызов можно выполнять, иначе сколько ждать."""
+        state = self.state
+        if state == CLOSED:
+            return None
+        if state == HALF_OPEN:
+            # Пробный вызов, не вернувшийся за recovery_timeout (например,
+            # отменённый), не должен держать цепь полуоткрытой вечно.
+            probe_age = self._clock() - self._probe_started
+            if self._probing and probe_age < self.recovery_timeout:
+                return self.recovery_timeout - probe_age
+            self._probing = True
+            self._probe_started = self._clock()
+            return None
+        return self.recovery_timeout - (self._clock() - self._opened_at)
+
+    async def acquire(self) -> None:
+        while (retry_in := self._admit()) is not None:
+            if not self.wait:
+                raise CircuitOpenError(retry_in)
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            try:
+                await asyncio.wait_for(self._changed.wait(), retry_in)
+            except asyncio.TimeoutError:
+                pass
+
+    def acquire_sync(self) -> None:
+        while (retry_in := self._admit()) is not None:
+            if not self.wait:
+                raise CircuitOpenError(retry_in)
+            time.sleep(retry_in)
+
+    def record_success(self) -> None:
+        self._failures = 0
+        if self._state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == HALF_OPEN or (
+            self._state == CLOSED and self._failures >= self.failure_threshold
+        ):
+            self._transition(OPEN)
 
 
 def handle_exception(
@@ -50,12 +247,17 @@ def handle_exception(
     client_errors: Iterable,
     func_name: str,
 ) -> None:
-    """Обрабатывает исключения во время выполнения функции."""
+    """
+    Обрабатывает исключения во время выполнения функции.
+
+    Повторяемая ошибка пишется в DEBUG (повторы считает Metrics), ERROR —
+    только когда попытки исчерпаны или ошибка на стороне клиента.
+    """
     if isinstance(e, errors):  # type: ignore
-        logger.error(f"Error {e}")
         if restart_count > max_restart:
-            logger.error("Превышено кол-во попыток подключения.")
+            logger.error(f"Превышено кол-во попыток подключения: {e}")
             raise RuntimeError(f"Превышено мах попыток в {func_name}: {e}")
+        logger.debug(f"Попытка {restart_count + 1} в {func_name}: {e}")
     elif isinstance(e, client_errors):  # type: ignore
         logger.error(f"Проблема на стороне клиента - {e}")
         raise RuntimeError(f"Проблема на стороне клиента в {func_name}: {e}")
@@ -70,6 +272,12 @@ def backoff(
     max_restart: int = 100,
     errors: Iterable = (Exception,),
     client_errors: Iterable = (),
+    jitter: str = PROPORTIONAL,
+    rate_limiter: TokenBucket | None = None,
+    breaker: CircuitBreaker | None = None,
+    attempt_timeout: float | None = None,
+    deadline: float | None = None,
+    metrics: Metrics | None = None,
 ) -> Callable[[FuncType], FuncType]:
     """
     Функция для повторного выполнения функции через некоторое время,
@@ -87,18 +295,84 @@ def backoff(
     :max_restart: - мах кол-во попыток восстановления соеденения
     :errors: - ошибки при которых разумна попытка переподключения
     :client_errors: - ошибка на стороне клиента, переподключения неактуально
+    :jitter: - стратегия разброса задержки, см. get_sleep_time
+    :rate_limiter: - общий TokenBucket: каждая попытка берёт токен, а
+        задержка от сервера (атрибут retry_after ошибки) ставит на паузу
+        всех его пользователей
+    :breaker: - общий CircuitBreaker: ошибки из errors размыкают цепь,
+        при разомкнутой цепи повторы прекращаются (CircuitOpenError) или
+        ждут пробного вызова
+    :attempt_timeout: - лимит в секундах на одну попытку (asyncio.timeout);
+        истёкшая попытка — TimeoutError, повторяется, если входит в errors.
+        Синхронный вызов прервать нельзя, для него параметр не действует
+    :deadline: - общий бюджет в секундах на все попытки, ожидания и паузы;
+        если следующая пауза в него не укладывается, она пропускается и
+        сразу выбрасывается DeadlineExceeded (в sync — по прошедшему
+        времени между попытками)
+    :metrics: - Metrics, куда пишутся повторы по классу ошибки, паузы и
+        ожидание breaker
     :return: результат выполнения функции
     """
+    if jitter not in JITTER_STRATEGIES:
+        raise ValueError(f"Unknown jitter strategy: {jitter}")
+
+    def next_delay(e: Exception, n: int, previous: float | None) -> float:
+        delay = server_delay(e)
+        if delay is None:
+            return get_sleep_time(
+                n, start_sleep_time, factor, border_sleep_time, jitter, previous
+            )
+        if rate_limiter is not None:
+            rate_limiter.pause(delay)
+        return delay + random.uniform(0, start_sleep_time)
+
+    def time_left(started: float) -> float | None:
+        if deadline is None:
+            return None
+        return deadline - (time.monotonic() - started)
+
+    def attempt_budget(started: float) -> float | None:
+        left = time_left(started)
+        if attempt_timeout is None:
+            return left
+        return attempt_timeout if left is None else min(attempt_timeout, left)
+
+    def check_deadline(started: float, delay: float, name: str) -> None:
+        left = time_left(started)
+        if left is not None and delay >= left:
+            logger.error(f"Бюджет {deadline} с на {name} исчерпан.")
+            raise DeadlineExceeded(name, deadline)  # type: ignore
+
+    def record(e: Exception | None) -> None:
+        # Ошибки клиента означают, что upstream отвечает.
+        if breaker is None:
+            return
+        if e is not None and isinstance(e, errors):  # type: ignore
+            breaker.record_failure()
+        else:
+            breaker.record_success()
 
     def decorator(func: FuncType) -> FuncType:
         @wraps(func)
         async def async_wrapper(*args: Any, **kwargs: Any) -> RT:
             n: int = 0
             restart_count: int = 0
+            delay: float | None = None
+            started = time.monotonic()
             while True:
                 try:
-                    return await func(*args, **kwargs)
+                    async with asyncio.timeout(time_left(started)):
+                        if breaker is not None:
+                            await timed(breaker.acquire(), metrics, BREAKER)
+                        if rate_limiter is not None:
+                            await rate_limiter.acquire()
+                except TimeoutError:
+                    raise DeadlineExceeded(func.__name__, deadline) from None
+                try:
+                    async with asyncio.timeout(attempt_budget(started)):
+                        result = await func(*args, **kwargs)
                 except Exception as e:
+                    record(e)
                     handle_exception(
                         e,
                         restart_count,
@@ -107,20 +381,38 @@ def backoff(
                         client_errors,
                         func.__name__,
                     )
-                    await async_sleep_with_jitter(
-                        n, start_sleep_time, factor, border_sleep_time
-                    )
+                    delay = next_delay(e, n, delay)
+                    check_deadline(started, delay, func.__name__)
+                    if metrics is not None:
+                        metrics.observe_retry(e, delay)
+                    await asyncio.sleep(delay)
                     n += 1
                     restart_count += 1
+                else:
+                    record(None)
+                    return result
 
         @wraps(func)
         def sync_wrapper(*args: Any, **kwargs: Any) -> RT:  # type: ignore
             n: int = 0
             restart_count: int = 0
+            delay: float | None = None
+            started = time.monotonic()
             while True:
+                check_deadline(started, 0, func.__name__)
+                if breaker is not None:
+                    waiting = time.monotonic()
+                    breaker.acquire_sync()
+                    if metrics is not None:
+                        metrics.observe_wait(
+                            BREAKER, time.monotonic() - waiting
+                        )
+                if rate_limiter is not None:
+                    rate_limiter.acquire_sync()
                 try:
-                    return func(*args, **kwargs)  # type: ignore
+                    result = func(*args, **kwargs)  # type: ignore
                 except Exception as e:
+                    record(e)
                     handle_exception(
                         e,
                         restart_count,
@@ -129,11 +421,16 @@ def backoff(
                         client_errors,
                         func.__name__,
                     )
-                    sync_sleep_with_jitter(
-                        n, start_sleep_time, factor, border_sleep_time
-                    )
+                    delay = next_delay(e, n, delay)
+                    check_deadline(started, delay, func.__name__)
+                    if metrics is not None:
+                        metrics.observe_retry(e, delay)
+                    time.sleep(delay)
                     n += 1
                     restart_count += 1
+                else:
+                    record(None)
+                    return result
 
         if asyncio.iscoroutinefunction(func):
             return async_wrapper
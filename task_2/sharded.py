@@ -0,0 +1,141 @@
+"""
+Обход категории в нескольких процессах.
+
+Пространство ключей сортировки делится на непрерывные группы
+диапазонов (шарды); каждый шард обходит отдельный процесс со своим
+циклом событий и APIClient, а разбор заголовков (key) выполняется там
+же — так CPU-ёмкая обработка не упирается в один цикл событий.
+Родитель только складывает результаты шардов в их порядке.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from asyncio import Semaphore
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Hashable
+
+from crawler import Partition, crawl
+from metrics import Metrics
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+logger = logging.getLogger("sharded")
+
+# Фабрика клиента (принимает metrics=) и key передаются в процессы,
+# поэтому должны сериализоваться pickle (функции уровня модуля,
+# functools.partial).
+ClientFactory = Callable[..., Any]
+
+
+def split(partitions: list[Partition], shards: int) -> list[list[Partition]]:
+    """
+    Делит диапазоны на не больше shards непрерывных групп почти равной
+    длины с сохранением порядка.
+    """
+    shards = max(1, min(shards, len(partitions)))
+    size, extra = divmod(len(partitions), shards)
+    groups, start = [], 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(partitions[start:end])
+        start = end
+    return groups
+
+
+async def count_shard(
+    category: str,
+    partitions: list[Partition],
+    key: Callable[[str], Hashable],
+    client_factory: ClientFactory,
+    concurrency: int,
+    metrics: Metrics | None = None,
+) -> Counter:
+    counts: Counter = Counter()
+    async with client_factory(metrics=metrics) as client:
+        async for page in crawl(
+            client, category, partitions, Semaphore(concurrency)
+        ):
+            counts.update(key(m["title"]) for m in page.members)
+        if metrics is not None:
+            metrics.clients.append(client.stats())
+    logger.info(f"Шард {partitions[0].label}…: {sum(counts.values())}")
+    return counts
+
+
+def run_shard(
+    category: str,
+    partitions: list[Partition],
+    key: Callable[[str], Hashable],
+    client_factory: ClientFactory,
+    concurrency: int,
+    collect_metrics: bool = False,
+) -> tuple[Counter, Metrics | None]:
+    """Точка входа процесса: свой цикл событий на шард."""
+    metrics = Metrics() if collect_metrics else None
+    counts = asyncio.run(
+        count_shard(
+            category, partitions, key, client_factory, concurrency, metrics
+        )
+    )
+    return counts, metrics
+
+
+def merge(results: list[Counter]) -> Counter:
+    """Складывает счётчики шардов по порядку; ключи итога отсортированы."""
+    total: Counter = Counter()
+    for counts in results:
+        total.update(counts)
+    return Counter(dict(sorted(total.items())))
+
+
+async def count_sharded(
+    category: str,
+    partitions: list[Partition],
+    key: Callable[[str], Hashable],
+    client_factory: ClientFactory,
+    workers: int,
+    concurrency: int,
+    metrics: Metrics | None = None,
+) -> Counter:
+    """
+    Считает key(title) по категории в workers процессах.
+    С metrics в них добавляются метрики всех шардов.
+
+    Процессы запускаются через spawn (без наследования состояния
+    родителя), concurrency — семафор каждого процесса; ограничения
+    частоты и пула задаёт client_factory. Ошибка любого шарда
+    пробрасывается вызывающему, ещё не начатые шарды отменяются.
+    """
+    shards = split(partitions, workers)
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(
+        max_workers=len(shards),
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    try:
+        results = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    pool,
+                    run_shard,
+                    category,
+                    shard,
+                    key,
+                    client_factory,
+                    concurrency,
+                    metrics is not None,
+                )
+                for shard in shards
+            )
+        )
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    if metrics is not None:
+        for _, shard_metrics in results:
+            metrics.merge(shard_metrics)
+    return merge([counts for counts, _ in results])
@@ -0,0 +1,68 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, NamedTuple, TypeVar
+
+T = TypeVar("T")
+
+
+class FlightStats(NamedTuple):
+    requests: int
+    flights: int
+    coalesced: int
+    in_flight: int
+
+
+class _Flight(Generic[T]):
+    def __init__(self, task: "asyncio.Future[T]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых запросов, выполняющихся одновременно.
+
+    Первый вызов run(key, send) запускает send() отдельной задачей,
+    следующие с тем же key до её завершения ждут её же: один HTTP-вызов,
+    один разобранный ответ (общий объект — его нельзя изменять) или одна
+    ошибка для всех. Отмена одного ожидающего не прерывает запрос
+    остальных; задача отменяется, только когда ушли все ожидающие.
+    Завершённые запросы не запоминаются — это не кеш.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, _Flight] = {}
+        self._requests = self._flights_started = self._coalesced = 0
+
+    def stats(self) -> FlightStats:
+        return FlightStats(
+            requests=self._requests,
+            flights=self._flights_started,
+            coalesced=self._coalesced,
+            in_flight=len(self._flights),
+        )
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    async def run(self, key: Hashable, send: Callable[[], Awaitable[T]]) -> T:
+        self._requests += 1
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(send()))
+            self._flights[key] = flight
+            self._flights_started += 1
+            flight.task.add_done_callback(
+                lambda _, flight=flight: self._forget(key, flight)
+            )
+        else:
+            self._coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                self._forget(key, flight)
+                flight.task.cancel()
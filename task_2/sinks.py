@@ -0,0 +1,292 @@
+"""
+Потоковая запись результатов обхода.
+
+Строки копятся в буфере и пишутся пачками по batch_size во временный
+файл рядом с итоговым (path + ".part"); commit() дописывает хвост,
+делает fsync и атомарно переименовывает файл. Если запуск упал,
+итоговый файл не меняется, а в ".part" остаётся всё записанное до
+сбоя.
+
+Форматы: CSV (как beasts.csv), JSON Lines (запись на участника) и
+компактный колоночный BCOL без внешних зависимостей:
+
+    b"BCOL1\\n"
+    группа строк × N: <I число строк>, по колонке <I длина><zlib(данные)>
+    JSON-оглавление: колонки и смещения групп
+    <Q длина оглавления> b"BCOL"
+
+Данные колонки str — массив длин строк в UTF-8 (uint32) и сами строки
+подряд, колонки int — массив int64; всё little-endian.
+"""
+
+import csv
+import json
+import os
+import struct
+import sys
+import zlib
+from abc import ABC, abstractmethod
+from array import array
+from typing import IO, Any, Iterable, Sequence
+
+DEFAULT_BATCH_SIZE = 10_000
+BUFFER_SIZE = 1 << 20
+PART_SUFFIX = ".part"
+
+BCOL_MAGIC = b"BCOL1\n"
+BCOL_TAIL = b"BCOL"
+STR = "str"
+INT = "int"
+_ARRAY_TYPES = {STR: "I", INT: "q"}
+
+
+class Sink(ABC):
+    """
+    База потоковых приёмников: буфер, пачки, атомарная замена.
+
+    Наследники задают _open (файл во временном пути), _write_batch и
+    при необходимости _finish (хвост файла перед commit). Как контекст
+    менеджер: commit при успехе, abort при исключении.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        self.path = os.fspath(path)
+        self.tmp_path = self.path + PART_SUFFIX
+        self.columns = tuple(columns)
+        self.batch_size = batch_size
+        self.rows = 0
+        self._batch: list[Sequence[Any]] = []
+        self._file = self._open(self.tmp_path)
+
+    @abstractmethod
+    def _open(self, path: str) -> IO:
+        """Открывает временный файл path для записи."""
+
+    @abstractmethod
+    def _write_batch(self, rows: list[Sequence[Any]]) -> None:
+        """Пишет пачку строк в self._file."""
+
+    def _finish(self) -> None:
+        """Хвост файла перед commit; по умолчанию не нужен."""
+
+    def _emit(self, rows: list[Sequence[Any]]) -> None:
+        self._write_batch(rows)
+        self.rows += len(rows)
+
+    def write(self, rows: Iterable[Sequence[Any]]) -> None:
+        """Копит строки и пишет их пачками ровно по batch_size."""
+        self._batch.extend(rows)
+        while len(self._batch) >= self.batch_size:
+            self._emit(self._batch[: self.batch_size])
+            del self._batch[: self.batch_size]
+
+    def flush(self) -> None:
+        """Пишет неполную пачку и сбрасывает буфер файла."""
+        if self._batch:
+            self._emit(self._batch)
+            self._batch = []
+        self._file.flush()
+
+    def commit(self) -> None:
+        self.flush()
+        self._finish()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        """Закрывает файл, оставляя записанное в tmp_path."""
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+
+    def discard(self) -> None:
+        """Закрывает и удаляет временный файл: результата не будет."""
+        self._file.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+
+class CSVSink(Sink):
+    """CSV с заголовком columns; по умолчанию в utf-8-sig, как beasts.csv."""
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        encoding: str = "utf-8-sig",
+    ):
+        self.encoding = encoding
+        super().__init__(path, columns, batch_size)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.columns)
+
+    def _open(self, path: str) -> IO:
+        return open(
+            path,
+            "w",
+            newline="",
+            encoding=self.encoding,
+            buffering=BUFFER_SIZE,
+        )
+
+    def _write_batch(self, rows: list[Sequence[Any]]) -> None:
+        self._writer.writerows(rows)
+
+
+class JSONLSink(Sink):
+    """
+    Запись на строку: объект {колонка: значение}. Ключи кодируются один
+    раз в шаблон строки, для значений вызывается только кодировщик —
+    втрое быстрее json.dumps на словарь.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ):
+        super().__init__(path, columns, batch_size)
+        self._encode = json.JSONEncoder(ensure_ascii=False).encode
+        fields = ", ".join(
+            self._encode(column).replace("%", "%%") + ": %s"
+            for column in self.columns
+        )
+        self._template = "{" + fields + "}\n"
+
+    def _open(self, path: str) -> IO:
+        return open(path, "w", encoding="utf-8", buffering=BUFFER_SIZE)
+
+    def _write_batch(self, rows: list[Sequence[Any]]) -> None:
+        encode, template = self._encode, self._template
+        self._file.write(
+            "".join(template % tuple(map(encode, row)) for row in rows)
+        )
+
+
+def _pack(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+def _unpack(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+class ColumnarSink(Sink):
+    """
+    Колоночный формат BCOL (см. описание модуля): каждая пачка —
+    группа строк со сжатыми zlib колонками. types — STR или INT для
+    каждой колонки (по умолчанию все STR).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        columns: Sequence[str],
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        types: Sequence[str] | None = None,
+        level: int = 6,
+    ):
+        self.types = tuple(types or [STR] * len(columns))
+        valid = set(self.types) <= set(_ARRAY_TYPES)
+        if len(self.types) != len(columns) or not valid:
+            raise ValueError(f"Bad column types: {self.types}")
+        self.level = level
+        self._groups: list[tuple[int, int]] = []
+        super().__init__(path, columns, batch_size)
+        self._file.write(BCOL_MAGIC)
+
+    def _open(self, path: str) -> IO:
+        return open(path, "wb", buffering=BUFFER_SIZE)
+
+    def _encode(self, kind: str, values: Sequence[Any]) -> bytes:
+        if kind == INT:
+            return _pack(array(_ARRAY_TYPES[INT], values))
+        encoded = [str(value).encode("utf-8") for value in values]
+        lengths = array(_ARRAY_TYPES[STR], map(len, encoded))
+        return _pack(lengths) + b"".join(encoded)
+
+    def _write_batch(self, rows: list[Sequence[Any]]) -> None:
+        self._groups.append((self._file.tell(), len(rows)))
+        chunks = [struct.pack("<I", len(rows))]
+        for kind, values in zip(self.types, zip(*rows)):
+            data = zlib.compress(self._encode(kind, values), self.level)
+            chunks += [struct.pack("<I", len(data)), data]
+        self._file.write(b"".join(chunks))
+
+    def _finish(self) -> None:
+        footer = json.dumps(
+            {
+                "columns": list(zip(self.columns, self.types)),
+                "groups": self._groups,
+            }
+        ).encode("utf-8")
+        self._file.write(footer + struct.pack("<Q", len(footer)) + BCOL_TAIL)
+
+
+def _decode(kind: str, raw: bytes, rows: int) -> list:
+    if kind == INT:
+        return _unpack(_ARRAY_TYPES[INT], raw).tolist()
+    lengths = _unpack(_ARRAY_TYPES[STR], raw[: rows * 4])
+    values, position = [], rows * 4
+    for length in lengths:
+        values.append(raw[position : position + length].decode("utf-8"))
+        position += length
+    return values
+
+
+def read_columnar(path: str) -> dict[str, list]:
+    """Читает завершённый файл BCOL целиком: {колонка: значения}."""
+    with open(path, "rb") as file:
+        data = file.read()
+    if not data.startswith(BCOL_MAGIC) or not data.endswith(BCOL_TAIL):
+        raise ValueError(f"{path}: не BCOL или файл не завершён")
+    end = len(data) - len(BCOL_TAIL) - 8
+    (size,) = struct.unpack_from("<Q", data, end)
+    footer = json.loads(data[end - size : end])
+    columns: dict[str, list] = {name: [] for name, _ in footer["columns"]}
+    for offset, rows in footer["groups"]:
+        position = offset + 4
+        for name, kind in footer["columns"]:
+            (length,) = struct.unpack_from("<I", data, position)
+            position += 4
+            raw = zlib.decompress(data[position : position + length])
+            position += length
+            columns[name].extend(_decode(kind, raw, rows))
+    return columns
+
+
+SINKS = {".csv": CSVSink, ".jsonl": JSONLSink, ".bcol": ColumnarSink}
+
+
+def open_sink(path: str, columns: Sequence[str], **kwargs: Any) -> Sink:
+    """Приёмник по расширению файла: .csv, .jsonl или .bcol."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in SINKS:
+        raise ValueError(
+            f"Неизвестный формат {extension!r}, доступны: {', '.join(SINKS)}"
+        )
+    return SINKS[extension](path, columns, **kwargs)
@@ -1,11 +1,35 @@
+import argparse
 import asyncio
-import csv
+import json
 import logging
-import re
 from asyncio import Semaphore
+from collections import Counter
+from functools import partial
+from itertools import repeat
 from typing import Dict
 
-from api_client import APIClient
+from api_client import APIClient, PoolConfig
+from checkpoint import Checkpoint
+from crawler import (
+    DEFAULT_QUEUE_SIZE,
+    Partition,
+    crawl,
+    iter_partition_pages,
+    make_partitions,
+)
+from http_cache import DEFAULT_TTL, ResponseCache
+from incremental import recount
+from metrics import Metrics, merge_client_stats
+from sharded import count_sharded
+from sinks import CSVSink, Sink, open_sink
+from wiki import (
+    ALPHABET,
+    MAX_CONCURRENT_REQUESTS,
+    MAX_REQUESTS_PER_SECOND,
+    log_client_stats,
+    make_client,
+    normalize_first_char,
+)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -14,109 +38,270 @@ logging.basicConfig(
 )
 logger = logging.getLogger("solution")
 
-BASE_URL = "https://ru.wikipedia.org"
 CSV_FILENAME = "beasts.csv"
-MAX_CONCURRENT_REQUESTS = 10
+CACHE_PATH = ".beasts_cache.sqlite"
+STATE_PATH = ".beasts_state.jsonl"
+COUNTS_PATH = ".beasts_counts.json"
+CSV_COLUMNS = ("Буква", "Количество")
+# Колонки построчной выгрузки участников (--members).
+MEMBER_COLUMNS = ("title", "letter", "partition")
 WIKI_ANIMALS_EXPECTED = 47331  # актуально на 29.05.25
+CATEGORY_TITLE = "Категория:Животные_по_алфавиту"
 
 
-def normalize_first_char(title: str) -> str:
-    """Нормализует первую букву названия"""
-    if not title:
-        return "#"
+def letter_partition(letter: str) -> Partition:
+    """Диапазон ключей сортировки, в котором лежат записи на букву."""
+    start = None if letter == "#" else letter
+    for partition in make_partitions(ALPHABET[1:]):
+        if partition.start == start:
+            return partition
+    raise ValueError(f"Unknown letter: {letter}")
 
-    # Удаляем все не-буквы в начале
-    first_char = re.sub(r"^[^а-яА-ЯёЁ]*", "", title)
-    if not first_char:
-        return "#"
 
-    first_char = first_char[0].upper()
-    return "Е" if first_char in ("Ё", "Е") else first_char
+async def fetch_partition(
+    client: APIClient, partition: Partition, semaphore: Semaphore
+) -> Counter:
+    """Обходит диапазон категории и считает записи по первой букве."""
+    logger.info(f"Обработка диапазона: {partition}")
+    counts: Counter = Counter()
+    async for page in iter_partition_pages(
+        client, CATEGORY_TITLE, partition, semaphore
+    ):
+        counts.update(normalize_first_char(m["title"]) for m in page.members)
+    logger.info(
+        f"[{partition}] Все животные обработаны. Итого: {sum(counts.values())}"
+    )
+    return counts
 
 
 async def fetch_animals_by_letter(
     client: APIClient, letter: str, semaphore: Semaphore
 ) -> int:
     """Получает количество животных для указанной буквы алфавита."""
-    async with semaphore:
-        animals_count = 0
-        continue_token = None
-        logger.info(f"Обработка буквы: {letter}")
-
-        while True:
-            params = {
-                "action": "query",
-                "list": "categorymembers",
-                "cmtitle": "Категория:Животные_по_алфавиту",
-                "cmtype": "page|redirect",
-                "cmshow": "all",
-                "cmnamespace": "0",
-                "cmlimit": "500",
-                "format": "json",
-                "cmstartsortkeyprefix": letter,  # Начало буквы
-                "cmsort": "sortkey",
-            }
-            if continue_token:
-                params["cmcontinue"] = continue_token
-
-            response = await client.request("GET", "/w/api.php", params=params)
-
-            if (
-                "query" not in response
-                or "categorymembers" not in response["query"]
-            ):
-                logger.error(
-                    f"Неверный формат ответа для буквы {letter}: {response}"
-                )
-                return animals_count
+    counts = await fetch_partition(client, letter_partition(letter), semaphore)
+    return counts[letter]
 
-            animals = response["query"]["categorymembers"]
-            for animal in animals:
-                normalized_char = normalize_first_char(animal["title"])
-                if normalized_char == letter:
-                    animals_count += 1
 
-            # logger.info(f"[{letter}] Количество животных: {animals_count}")
+async def count_animals(
+    client: APIClient,
+    semaphore: Semaphore,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    checkpoint: Checkpoint | None = None,
+    sink: Sink | None = None,
+    use_cache: bool = True,
+) -> Dict[str, int]:
+    """
+    Считает животных по буквам за один проход по категории.
 
-            continue_token = response.get("continue", {}).get("cmcontinue")
-            if not continue_token:
-                logger.info(
-                    f"[{letter}] Все животные обработаны. Итого: {animals_count}"
-                )
-                break
+    Диапазоны загружаются параллельно (см. crawler.crawl), подсчёт идёт
+    по мере поступления страниц и не задерживает загрузку следующих.
+    С checkpoint прогресс каждой страницы сохраняется в журнал, а
+    уже пройденные в прошлых запусках страницы не запрашиваются.
+    В sink пишутся строки MEMBER_COLUMNS по каждому участнику; когда
+    диапазон пройден, его строки сбрасываются на диск. use_cache=False
+    загружает категорию мимо кеша клиента.
+    """
+    partitions = make_partitions(ALPHABET[1:])
+    counts: Counter = Counter()
+    tokens: dict[Partition, str] = {}
+    if checkpoint is not None:
+        counts = checkpoint.counts
+        partitions = checkpoint.pending(partitions)
+        tokens = checkpoint.tokens()
 
-        return animals_count
+    async for page in crawl(
+        client,
+        CATEGORY_TITLE,
+        partitions,
+        semaphore,
+        queue_size=queue_size,
+        tokens=tokens,
+        use_cache=use_cache,
+    ):
+        if sink is None:
+            page_counts = Counter(
+                normalize_first_char(m["title"]) for m in page.members
+            )
+        else:
+            titles = [m["title"] for m in page.members]
+            letters = list(map(normalize_first_char, titles))
+            page_counts = Counter(letters)
+            sink.write(zip(titles, letters, repeat(page.partition.label)))
+            if page.continue_token is None:
+                sink.flush()
+        counts.update(page_counts)
+        if checkpoint is not None:
+            checkpoint.record(page, page_counts)
+    return {letter: counts[letter] for letter in ALPHABET}
 
 
-async def main():
-    semaphore = Semaphore(MAX_CONCURRENT_REQUESTS)
+def worker_client_options(client_options: dict | None, workers: int) -> dict:
+    """
+    Параметры make_client для одного из workers процессов: частота,
+    предел AIMD-лимитера и соединения на хост делятся поровну, чтобы
+    вместе процессы нагружали API не сильнее одного.
+    """
+    options = {
+        "rate": MAX_REQUESTS_PER_SECOND,
+        "config": PoolConfig(limit_per_host=MAX_CONCURRENT_REQUESTS),
+        "max_concurrency": MAX_CONCURRENT_REQUESTS,
+        **(client_options or {}),
+    }
+    if options["rate"]:
+        options["rate"] /= workers
+    config = options["config"]
+    if config.limit_per_host:  # 0 — без ограничения
+        options["config"] = config._replace(
+            limit_per_host=max(1, config.limit_per_host // workers)
+        )
+    options["max_concurrency"] = max(1, options["max_concurrency"] // workers)
+    return options
+
+
+async def count_animals_sharded(
+    workers: int,
+    client_options: dict | None = None,
+    metrics: Metrics | None = None,
+) -> Dict[str, int]:
+    """
+    Считает животных по буквам в workers процессах (см. sharded.py)
+    с лимитами worker_client_options.
+    """
+    options = worker_client_options(client_options, workers)
+    counts = await count_sharded(
+        CATEGORY_TITLE,
+        make_partitions(ALPHABET[1:]),
+        normalize_first_char,
+        partial(make_client, **options),
+        workers,
+        options["max_concurrency"],
+        metrics,
+    )
+    return {letter: counts[letter] for letter in ALPHABET}
+
+
+def run_report(metrics: Metrics, client: APIClient) -> dict:
+    """
+    Отчёт запуска: метрики и итоговая статистика клиента.
 
-    # без "Ё", '#' - аггрегирует спецсимволы и все не начинается с кириллицы.
-    # alphabet = "#АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЭЮЯ"
-    alphabet = "#" + "".join(map(chr, range(ord("А"), ord("Я") + 1)))
+    Если полный обход шёл в процессах-шардах, вместо статистики клиента
+    основного процесса (он почти не отправляет запросов) в отчёт идёт
+    сводка по клиентам шардов.
+    """
+    if metrics.clients:
+        extra = merge_client_stats(metrics.clients)
+        return metrics.report(workers=len(metrics.clients), **extra)
+    return metrics.report(**client.stats())
 
-    results: Dict[str, int] = {}
 
-    async with APIClient(BASE_URL) as client:
-        tasks = []
-        for letter in alphabet:
-            tasks.append(fetch_animals_by_letter(client, letter, semaphore))
+async def main(
+    cache_path: str | None = None,
+    cache_ttl: float = DEFAULT_TTL,
+    state_path: str | None = None,
+    resume: bool = False,
+    hedge: bool = False,
+    counts_path: str | None = None,
+    full: bool = False,
+    report_path: str | None = None,
+    csv_path: str | None = None,
+    client_options: dict | None = None,
+    workers: int = 1,
+    members_path: str | None = None,
+):
+    """
+    Считает животных и пишет итог в csv_path (по умолчанию CSV_FILENAME).
 
-        counts = await asyncio.gather(*tasks)
+    С members_path участники выгружаются построчно по мере обхода (формат
+    по расширению, см. sinks.open_sink); файл появляется атомарно после
+    успешного полного обхода, при сбое записанное остаётся в «.part».
 
-        for letter, count in zip(alphabet, counts):
-            results[letter] = count
+    resume продолжает прерванный полный обход по журналу state_path,
+    поэтому пересчёт по изменениям (counts_path) при нём не выполняется.
+
+    client_options передаются в make_client. С workers > 1 полный обход
+    идёт в нескольких процессах (count_animals_sharded); журнал прогресса
+    и кеш ответов тогда используются только основным процессом.
+    """
+    csv_path = csv_path or CSV_FILENAME
+    if members_path and (resume or workers > 1):
+        raise ValueError("members_path несовместим с resume и workers > 1")
+    full = full or resume
+    semaphore = Semaphore(MAX_CONCURRENT_REQUESTS)
+    cache = ResponseCache(cache_path, ttl=cache_ttl) if cache_path else None
+    checkpoint = Checkpoint(state_path, resume) if state_path else None
+    metrics = Metrics()
+    sink = open_sink(members_path, MEMBER_COLUMNS) if members_path else None
+    crawled = False
+
+    try:
+        async with make_client(
+            cache, hedge, metrics, **(client_options or {})
+        ) as client:
+
+            def full_count():
+                nonlocal crawled
+                crawled = True
+                if workers > 1:
+                    return count_animals_sharded(
+                        workers, client_options, metrics
+                    )
+                # Итог пересчёта по изменениям привязан к свежему водяному
+                # знаку, поэтому его полный обход идёт мимо кеша.
+                return count_animals(
+                    client,
+                    semaphore,
+                    checkpoint=checkpoint,
+                    sink=sink,
+                    use_cache=not counts_path,
+                )
+
+            if counts_path:
+                counts = await recount(
+                    client,
+                    CATEGORY_TITLE,
+                    counts_path,
+                    full_count,
+                    normalize_first_char,
+                    semaphore,
+                    full=full,
+                )
+                results = {letter: counts.get(letter, 0) for letter in ALPHABET}
+            else:
+                results = await full_count()
+            log_client_stats(client)
+            report = run_report(metrics, client)
+    except BaseException:
+        if sink is not None:
+            sink.abort()
+            logger.error(f"Выгрузка участников оборвана: {sink.tmp_path}")
+        raise
+    finally:
+        if cache is not None:
+            cache.close()
+        if checkpoint is not None:
+            checkpoint.close()
+    if checkpoint is not None:
+        checkpoint.remove()
+    if sink is not None and crawled:
+        sink.commit()
+        logger.info(f"Участники ({sink.rows}) сохранены в {members_path}.")
+    elif sink is not None:
+        sink.discard()  # пересчёт по изменениям: участников не было
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        logger.info(f"Отчёт о запуске сохранён в {report_path}.")
+    else:
+        logger.info(f"Отчёт о запуске: {text}")
 
     try:
-        with open(
-            CSV_FILENAME, "w", newline="", encoding="utf-8-sig"
-        ) as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerow(["Буква", "Количество"])
-            writer.writerows(results.items())
+        with CSVSink(csv_path, CSV_COLUMNS) as csv_sink:
+            csv_sink.write(results.items())
 
         total = sum(results.values())
-        logger.info("Результаты сохранены в файл beasts.csv.")
+        logger.info(f"Результаты сохранены в файл {csv_path}.")
         logger.info(
             f"Общее количество животных: {total} (ожидалось: {WIKI_ANIMALS_EXPECTED})"
         )
@@ -125,4 +310,71 @@ async def main():
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--cache",
+        default=CACHE_PATH,
+        help="файл кеша ответов API; пустая строка отключает кеш",
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        default=DEFAULT_TTL,
+        help="сколько секунд ответ считается свежим без перепроверки",
+    )
+    parser.add_argument(
+        "--state",
+        default=STATE_PATH,
+        help="журнал прогресса обхода; пустая строка отключает его",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="продолжить прерванный обход с сохранённого прогресса "
+        "(всегда полный обход, без пересчёта по изменениям)",
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="дублировать GET-запросы, отвечающие дольше p95",
+    )
+    parser.add_argument(
+        "--counts",
+        default=COUNTS_PATH,
+        help="итоги прошлого подсчёта для пересчёта по изменениям; "
+        "пустая строка — всегда полный обход",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="пересчитать категорию полным обходом",
+    )
+    parser.add_argument(
+        "--report",
+        help="файл JSON-отчёта о запуске (по умолчанию — в лог)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="число процессов полного обхода; 1 — один цикл событий",
+    )
+    parser.add_argument(
+        "--members",
+        help="выгрузка участников по мере обхода: .csv, .jsonl или .bcol",
+    )
+    args = parser.parse_args()
+    asyncio.run(
+        main(
+            args.cache,
+            args.cache_ttl,
+            args.state,
+            args.resume,
+            args.hedge,
+            args.counts,
+            args.full,
+            args.report,
+            workers=args.workers,
+            members_path=args.members,
+        )
+    )
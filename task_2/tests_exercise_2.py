@@ -1,10 +1,50 @@
 # pytest tests_exercise_2.py -v
+import asyncio
+import csv
+import json
 from asyncio import Semaphore
-from unittest.mock import patch
+from collections import Counter
+from contextlib import aclosing
+from datetime import datetime, timezone
+from functools import partial
+from unittest.mock import AsyncMock, patch
 
 import pytest
-from mock_api_client import MockAPIClient
-from solution import fetch_animals_by_letter, normalize_first_char
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from api_client import APIClient, PoolConfig
+from checkpoint import Checkpoint, load_state
+from crawler import Page, Partition, crawl
+from fake_wiki import FakeWiki, FaultConfig, SyntheticCategory
+from hedging import HedgePolicy
+from http_cache import ResponseCache, make_key
+from incremental import load_state as incremental_state
+from incremental import recount
+from jobs import CategorySpec, JobRunner
+from jobs import main as run_jobs
+from limiter import AIMDLimiter, StaticLimiter
+from metrics import Histogram, Metrics, merge_client_stats
+from mock_api_client import DEFAULT_MEMBERS, MockAPIClient
+from my_backoff import (
+    DECORRELATED,
+    FULL,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    TokenBucket,
+    backoff,
+    get_sleep_time,
+)
+from sharded import count_sharded, split
+from singleflight import SingleFlight
+from sinks import INT, STR, Sink, open_sink, read_columnar
+from solution import (
+    count_animals,
+    fetch_animals_by_letter,
+    make_partitions,
+    worker_client_options,
+)
+from wiki import ALPHABET, make_client, normalize_first_char, sortkey
 
 
 def test_normalize_first_char():
@@ -15,6 +55,8 @@ def test_normalize_first_char():
     assert normalize_first_char("") == "#"
     assert normalize_first_char("Łoś") == "#"
     assert normalize_first_char("#метка") == "М"
+    assert normalize_first_char("«Ёлка»") == "Е"
+    assert normalize_first_char("Zebra") == "#"
 
 
 @pytest.mark.asyncio
@@ -40,7 +82,7 @@ async def test_main_integration(tmp_path, monkeypatch):
 
     monkeypatch.setattr("solution.CSV_FILENAME", str(test_csv))
 
-    with patch("solution.APIClient", MockAPIClient):
+    with patch("wiki.APIClient", MockAPIClient):
         from solution import main
 
         await main()
@@ -55,11 +97,1140 @@ async def test_main_integration(tmp_path, monkeypatch):
 @pytest.mark.asyncio
 async def test_file_write_error(caplog):
     """Проверка обработки ошибки записи в файл."""
-    with patch("solution.APIClient", MockAPIClient), patch(
-        "solution.open", side_effect=IOError("Disk full")
+    with patch("wiki.APIClient", MockAPIClient), patch(
+        "sinks.open", side_effect=IOError("Disk full")
     ):
         from solution import main
 
         await main()
 
         assert "Ошибка записи в файл: Disk full" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_main_resume_forces_full_crawl(tmp_path):
+    """--resume не уходит в пересчёт по изменениям мимо журнала."""
+    recount = AsyncMock(return_value={"Б": 3})
+    with patch("wiki.APIClient", MockAPIClient), patch(
+        "solution.recount", recount
+    ):
+        from solution import main
+
+        await main(
+            state_path=str(tmp_path / "state.jsonl"),
+            resume=True,
+            counts_path=str(tmp_path / "counts.json"),
+            csv_path=str(tmp_path / "beasts.csv"),
+        )
+    assert recount.await_args.kwargs["full"] is True
+
+
+@pytest.mark.asyncio
+async def test_count_animals_single_pass():
+    """Каждая запись категории запрашивается один раз, запросов — O(n)."""
+    members = [f"{letter}вец {i}" for letter in ALPHABET[1:] for i in range(25)]
+    members += [f"Zebra {i}" for i in range(25)]
+    client = MockAPIClient(members=members, page_size=10)
+
+    results = await count_animals(client, Semaphore(10))
+
+    assert results == {letter: 25 for letter in ALPHABET}
+    # 33 диапазона по 25 записей, по 3 страницы на диапазон
+    assert len(make_partitions(ALPHABET[1:])) == 33
+    assert client.request_count == 33 * 3
+
+
+@pytest.mark.asyncio
+async def test_fetch_animals_by_letter_stops_at_next_letter():
+    """Обход буквы не продолжается за её диапазон."""
+    client = MockAPIClient(page_size=1)
+    assert await fetch_animals_by_letter(client, "Б", Semaphore(1)) == 3
+    assert client.request_count == 3
+    assert client.requests[0]["cmendsortkeyprefix"] == "В"
+
+
+@pytest.mark.asyncio
+async def test_crawl_backpressure():
+    """Загрузчики ждут, пока потребитель не освободит очередь."""
+    client = MockAPIClient(
+        members=[f"Зверь {i}" for i in range(50)], page_size=1
+    )
+    pages = crawl(client, "cat", [Partition(None, None)], Semaphore(5), 2)
+
+    first = await pages.__anext__()
+    for _ in range(20):
+        await asyncio.sleep(0)
+    assert first.members[0]["title"] == "Зверь 0"
+    assert client.request_count <= 4  # очередь на 2 страницы + одна в работе
+
+    titles = [m["title"] for m in first.members]
+    async for page in pages:
+        titles.extend(m["title"] for m in page.members)
+    assert len(titles) == 50 and client.request_count == 50
+
+
+class FailingClient(MockAPIClient):
+    async def request(self, method, url, params, use_cache=True):
+        if self.request_count == 3:
+            raise RuntimeError("upstream down")
+        return await super().request(method, url, params, use_cache)
+
+
+@pytest.mark.asyncio
+async def test_crawl_error_propagates():
+    """Ошибка загрузчика доходит до потребителя."""
+    client = FailingClient(members=[f"Зверь {i}" for i in range(10)])
+    with pytest.raises(RuntimeError, match="upstream down"):
+        async for _ in crawl(
+            client, "cat", [Partition(None, None)], Semaphore(1)
+        ):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_crawl_early_exit_cancels_fetchers():
+    """Закрытие итератора останавливает загрузку."""
+    client = MockAPIClient(
+        members=[f"Зверь {i}" for i in range(50)], page_size=1
+    )
+    pages = crawl(client, "cat", [Partition(None, None)], Semaphore(1), 1)
+    async with aclosing(pages):
+        async for _ in pages:
+            break
+    count = client.request_count
+    await asyncio.sleep(0.01)
+    assert client.request_count == count
+
+
+@pytest.mark.asyncio
+async def test_api_client_pool_limits_and_reuse():
+    """Коннектор ограничивает параллелизм и переиспользует соединения."""
+    active = peak = 0
+
+    async def handler(request):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get("/api", handler)
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        config = PoolConfig(limit_per_host=2)
+        async with APIClient(base_url, config) as client:
+            await asyncio.gather(
+                *(client.request("GET", "/api") for _ in range(10))
+            )
+            stats = client.pool_stats()
+
+    assert peak <= 2
+    assert stats.limit_per_host == 2
+    assert stats.new_connections <= 2
+    assert stats.reused_connections >= 8
+    assert stats.queued > 0
+    assert stats.in_flight == 0 and stats.peak_in_flight == 10
+
+
+def test_cache_key_ignores_param_order():
+    """Порядок параметров не влияет на ключ кеша."""
+    assert make_key("get", "/w", {"a": 1, "b": "x"}) == make_key(
+        "GET", "/w", {"b": "x", "a": "1"}
+    )
+    assert make_key("GET", "/w", {"a": 1}) != make_key("GET", "/w", {"a": 2})
+
+
+@pytest.mark.asyncio
+async def test_cache_serves_repeated_run_offline(tmp_path):
+    """Повторный прогон APIClient отвечает из кеша, после TTL — с сервера."""
+    now = [0.0]
+    path = str(tmp_path / "cache.sqlite")
+    category = SyntheticCategory(300)
+    wiki = FakeWiki(category)
+
+    async def run(cache):
+        async with APIClient(base_url, cache=cache) as client:
+            return await count_animals(client, Semaphore(10))
+
+    async with TestServer(wiki.app()) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        with ResponseCache(path, ttl=60, clock=lambda: now[0]) as cache:
+            assert await run(cache) == category.counts()
+        fetched = wiki.requests
+        assert fetched > 0
+
+        with ResponseCache(path, ttl=60, clock=lambda: now[0]) as cache:
+            assert await run(cache) == category.counts()
+            assert wiki.requests == fetched
+            assert cache.stats().hits == fetched
+
+            now[0] = 120
+            assert await run(cache) == category.counts()
+            assert wiki.requests == 2 * fetched
+
+            async with APIClient(base_url, cache=cache) as client:
+                await count_animals(client, Semaphore(10), use_cache=False)
+            assert wiki.requests == 3 * fetched
+
+
+@pytest.mark.asyncio
+async def test_api_client_revalidates_cache():
+    """APIClient перепроверяет устаревшую запись по ETag; ошибки не кеширует."""
+    seen = []
+
+    async def handler(request):
+        seen.append((request.query["q"], request.headers.get("If-None-Match")))
+        if request.query["q"] == "bad":
+            return web.json_response({"error": {"code": "badvalue"}})
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304)
+        return web.json_response(
+            {"query": {"n": 1}},
+            headers={"ETag": '"v1"', "Last-Modified": "Thu, 29 May 2025"},
+        )
+
+    now = [0.0]
+    cache = ResponseCache(ttl=60, clock=lambda: now[0])
+    app = web.Application()
+    app.router.add_get("/api", handler)
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        async with APIClient(base_url, cache=cache) as client:
+
+            async def get(q):
+                return await client.request("GET", "/api", params={"q": q})
+
+            assert await get("ok") == {"query": {"n": 1}}
+            assert await get("ok") == {"query": {"n": 1}}
+            now[0] = 120
+            assert await get("ok") == {"query": {"n": 1}}
+            for _ in range(2):
+                assert "error" in await get("bad")
+
+    assert seen == [("ok", None), ("ok", '"v1"'), ("bad", None), ("bad", None)]
+    entry = cache.get(make_key("GET", "/api", {"q": "ok"}))
+    assert (entry.etag, entry.last_modified) == ('"v1"', "Thu, 29 May 2025")
+    assert entry.stored_at == 120
+    assert cache.stats()[:3] == (1, 1, 3)  # hits, revalidated, misses
+
+
+@pytest.mark.asyncio
+async def test_cache_lru_eviction():
+    """При превышении max_bytes вытесняются давно не читавшиеся записи."""
+    now = [0.0]
+    cache = ResponseCache(max_bytes=60, clock=lambda: now[0])
+    for i, key in enumerate("abc"):
+        now[0] = i
+        cache.put(key, {"value": "x" * 5})
+    now[0] = 10
+    assert cache.get("a") is not None
+    now[0] = 11
+    cache.put("d", {"value": "x" * 5})
+
+    assert cache.get("b") is None and cache.get("c") is not None
+    assert cache.get("a") is not None and cache.get("d") is not None
+    assert cache.stats().evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_resume_after_crash(tmp_path):
+    """Возобновлённый обход не повторяет сохранённые страницы."""
+    path = str(tmp_path / "state.jsonl")
+    members = [f"{letter}вец {i}" for letter in "АБВ" for i in range(6)]
+    full = MockAPIClient(members=members, page_size=2)
+    expected = await count_animals(full, Semaphore(1))
+
+    crashed = FailingClient(members=members, page_size=2)
+    with Checkpoint(path) as checkpoint:
+        with pytest.raises(RuntimeError):
+            await count_animals(
+                crashed, Semaphore(1), queue_size=1, checkpoint=checkpoint
+            )
+
+    resumed = MockAPIClient(members=members, page_size=2)
+    with Checkpoint(path, resume=True) as checkpoint:
+        result = await count_animals(
+            resumed, Semaphore(1), checkpoint=checkpoint
+        )
+
+    assert result == expected
+    assert resumed.request_count < full.request_count
+    assert all(p.done for p in load_state(path).values())
+
+
+def test_checkpoint_ignores_torn_tail(tmp_path):
+    """Оборванная строка журнала отбрасывается и не мешает дописыванию."""
+    path = tmp_path / "state.jsonl"
+    partition = Partition("А", "Б")
+    with Checkpoint(str(path), flush_every=1) as checkpoint:
+        checkpoint.record(Page(partition, [], "5"), {"А": 2})
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('{"partition": ["А", "Б"], "cont')
+
+    with Checkpoint(str(path), resume=True) as checkpoint:
+        assert checkpoint.tokens() == {partition: "5"}
+        checkpoint.record(Page(partition, [], None), {"А": 1})
+
+    state = load_state(str(path))
+    assert state[partition].done and state[partition].counts == {"А": 3}
+
+
+async def simulate(limiter, requests=600, workers=64, capacity=8, base=0.002):
+    """
+    Модель сервера: до capacity запросов обслуживаются за base секунд,
+    дальше задержка растёт линейно, а свыше 2 * capacity — отказ 503.
+    Возвращает пропускную способность (успешных запросов в секунду)
+    и число отказов.
+    """
+    active = drops = 0
+    remaining = requests
+    loop = asyncio.get_running_loop()
+
+    async def worker():
+        nonlocal active, drops, remaining
+        while remaining > 0:
+            remaining -= 1
+            started = await limiter.acquire()
+            active += 1
+            overloaded = active > 2 * capacity
+            await asyncio.sleep(base * max(1, active / capacity))
+            active -= 1
+            drops += overloaded
+            limiter.release(started, dropped=overloaded)
+
+    began = loop.time()
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return (requests - drops) / (loop.time() - began), drops
+
+
+@pytest.mark.asyncio
+async def test_aimd_limiter_converges():
+    """AIMD находит параллелизм около ёмкости сервера без шторма отказов."""
+    limiter = AIMDLimiter(initial=1, max_limit=64)
+    throughput, drops = await simulate(limiter)
+    serial, _ = await simulate(StaticLimiter(1), requests=100)
+    best, _ = await simulate(StaticLimiter(8))
+    _, flood_drops = await simulate(StaticLimiter(64))
+
+    assert 4 <= limiter.limit <= 2 * 8 + 1
+    assert throughput > 3 * serial and throughput > best / 2
+    assert drops < flood_drops / 10
+    assert limiter.stats().in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_aimd_limiter_decreases_once_per_wave():
+    """Пачка отказов от одной волны запросов снижает лимит один раз."""
+    now = [0.0]
+    limiter = AIMDLimiter(initial=8, clock=lambda: now[0])
+    started = [await limiter.acquire() for _ in range(8)]
+    now[0] = 1.0
+    for s in started:
+        limiter.release(s, dropped=True)
+
+    assert limiter.limit == 4
+    assert limiter.stats().decreases == 1 and limiter.stats().drops == 8
+
+
+def test_jitter_strategies():
+    """Full и decorrelated jitter остаются в своих границах."""
+    for n in range(6):
+        assert 0 <= get_sleep_time(n, 0.1, 2, 1, FULL) <= min(1, 0.1 * 2**n)
+    previous = None
+    for n in range(20):
+        previous = get_sleep_time(n, 0.1, 2, 1, DECORRELATED, previous)
+        assert 0.1 <= previous <= 1
+    with pytest.raises(ValueError):
+        backoff(jitter="lockstep")
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_caps_rate():
+    """Ведро пропускает не больше rate запросов в секунду после всплеска."""
+    bucket = TokenBucket(rate=200, capacity=5)
+    loop = asyncio.get_running_loop()
+    began = loop.time()
+    await asyncio.gather(*(bucket.acquire() for _ in range(45)))
+    # 5 токенов сразу, остальные 40 — со скоростью 200 в секунду
+    assert loop.time() - began >= 40 / 200 * 0.9
+
+    bucket = TokenBucket(rate=50, capacity=1)
+    await bucket.acquire()
+    done = []
+
+    async def acquire():
+        await bucket.acquire()
+        done.append(loop.time())
+
+    # Часть ожидающих встала в очередь до паузы, часть — во время неё.
+    queued = [asyncio.create_task(acquire()) for _ in range(3)]
+    await asyncio.sleep(0)
+    bucket.pause(0.1)
+    began = loop.time()
+    await asyncio.gather(*queued, *(acquire() for _ in range(3)))
+    # После паузы ожидающие выходят по одному с шагом 1/rate, а не разом:
+    # k-й — не раньше паузы плюс k шагов.
+    for k, finished in enumerate(done):
+        assert finished - began >= 0.1 + k / 50 - 0.005
+
+
+@pytest.mark.asyncio
+async def test_backoff_honours_server_delay():
+    """Задержка из retry_after важнее экспоненты и ставит ведро на паузу."""
+    clock = [0.0]
+    bucket = TokenBucket(rate=1000, clock=lambda: clock[0])
+    calls = []
+
+    class Lagged(Exception):
+        retry_after = 2.5
+
+    @backoff(start_sleep_time=0.1, max_restart=3, rate_limiter=bucket)
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise Lagged()
+        return "ok"
+
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+        clock[0] += delay
+
+    with patch("my_backoff.asyncio.sleep", fake_sleep):
+        assert await flaky() == "ok"
+    assert 2.5 <= sleeps[0] <= 2.6
+    assert bucket._paused_until == 2.5
+
+
+@pytest.mark.asyncio
+async def test_api_client_retries_429_and_maxlag():
+    """429 с Retry-After и ошибка maxlag повторяются, а не падают."""
+    replies = [
+        web.Response(status=429, headers={"Retry-After": "0"}),
+        web.json_response(
+            {"error": {"code": "maxlag", "info": "Waiting for db: 6 s"}},
+            headers={"Retry-After": "0"},
+        ),
+        web.json_response({"ok": True}),
+    ]
+    seen = []
+
+    async def handler(request):
+        seen.append(request.query.get("maxlag"))
+        return replies[len(seen) - 1]
+
+    app = web.Application()
+    app.router.add_get("/api", handler)
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        async with APIClient(
+            base_url, maxlag=5, rate_limiter=TokenBucket(100)
+        ) as client:
+            assert await client.request("GET", "/api") == {"ok": True}
+    assert seen == ["5", "5", "5"]
+
+
+def test_circuit_breaker_fails_fast_and_recovers():
+    """Цепь размыкается после серии ошибок и замыкается пробным вызовом."""
+    now = [0.0]
+    transitions = []
+    breaker = CircuitBreaker(
+        failure_threshold=2,
+        recovery_timeout=10,
+        on_state_change=lambda old, new: transitions.append(new),
+        clock=lambda: now[0],
+    )
+    calls = []
+
+    @backoff(start_sleep_time=0, max_restart=5, breaker=breaker)
+    def call(fail: bool):
+        calls.append(fail)
+        if fail:
+            raise ConnectionError("down")
+        return "ok"
+
+    with patch("my_backoff.time.sleep"):
+        with pytest.raises(CircuitOpenError):
+            call(True)
+        assert len(calls) == 2  # вместо max_restart повторов
+        with pytest.raises(CircuitOpenError):
+            call(False)
+        assert len(calls) == 2
+
+        now[0] = 10
+        assert breaker.state == "half_open"
+        assert call(False) == "ok"
+    assert transitions == ["open", "half_open", "closed"]
+
+
+def test_backoff_logs_error_only_when_retries_run_out(caplog):
+    """Повторы не шумят в ERROR, исчерпание попыток — да."""
+
+    @backoff(start_sleep_time=0, max_restart=2)
+    def always_fails():
+        raise ConnectionError("down")
+
+    with patch("my_backoff.time.sleep"), pytest.raises(RuntimeError):
+        always_fails()
+    errors = [r for r in caplog.records if r.levelname == "ERROR"]
+    assert len(errors) == 1 and "Превышено" in errors[0].getMessage()
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_parks_callers_until_probe():
+    """При wait=True ждущие вызовы пропускаются только после пробы."""
+    breaker = CircuitBreaker(
+        failure_threshold=1, recovery_timeout=0.02, wait=True
+    )
+    breaker.record_failure()
+    seen = []
+
+    @backoff(start_sleep_time=0, breaker=breaker)
+    async def call():
+        seen.append(breaker.state)
+        await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call() for _ in range(10)))
+    # Первым прошёл один пробный вызов, остальные — после замыкания.
+    assert seen == ["half_open"] + ["closed"] * 9
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_backoff_attempt_timeout_and_deadline():
+    """Зависшая попытка прерывается, а пауза сверх бюджета не делается."""
+    calls = []
+
+    @backoff(start_sleep_time=0, attempt_timeout=0.02, deadline=1)
+    async def hangs_once():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return "ok"
+
+    assert await hangs_once() == "ok" and len(calls) == 2
+
+    @backoff(start_sleep_time=5, deadline=1)
+    async def always_fails():
+        raise ConnectionError("down")
+
+    loop = asyncio.get_running_loop()
+    began = loop.time()
+    with pytest.raises(DeadlineExceeded):
+        await always_fails()
+    assert loop.time() - began < 0.5
+
+
+def test_backoff_sync_deadline():
+    """Синхронная обёртка соблюдает бюджет по прошедшему времени."""
+    now = [0.0]
+    calls = []
+
+    @backoff(start_sleep_time=0.4, factor=1, jitter=FULL, deadline=1)
+    def always_fails():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    def fake_sleep(delay):
+        now[0] += delay
+
+    with patch("my_backoff.time.sleep", fake_sleep), patch(
+        "my_backoff.time.monotonic", lambda: now[0]
+    ):
+        with pytest.raises(DeadlineExceeded):
+            always_fails()
+    assert now[0] < 1 and len(calls) >= 2
+
+
+@pytest.mark.asyncio
+async def test_api_client_deadline_bounds_slow_server():
+    """Медленный сервер не задерживает request дольше deadline."""
+
+    async def handler(request):
+        await asyncio.sleep(1)
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_get("/api", handler)
+    loop = asyncio.get_running_loop()
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        config = PoolConfig(total_timeout=0.05, deadline=0.3)
+        async with APIClient(base_url, config) as client:
+            began = loop.time()
+            with pytest.raises(DeadlineExceeded):
+                await client.request("GET", "/api")
+            assert loop.time() - began < 0.5
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_beats_slow_response():
+    """Дубликат медленного запроса отвечает раньше, оригинал отменяется."""
+    served = []
+
+    async def handler(request):
+        served.append(1)
+        if len(served) == 21:  # первая попытка после прогрева зависает
+            await asyncio.sleep(2)
+        return web.json_response({"n": len(served)})
+
+    app = web.Application()
+    app.router.add_get("/api", handler)
+    hedge = HedgePolicy(min_samples=20, max_ratio=0.5, min_delay=0.01)
+    loop = asyncio.get_running_loop()
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        async with APIClient(base_url, hedge=hedge) as client:
+            for _ in range(20):
+                await client.request("GET", "/api")
+            began = loop.time()
+            assert await client.request("GET", "/api") == {"n": 22}
+            assert loop.time() - began < 1
+
+    assert hedge.stats().hedges == 1 and hedge.stats().hedge_wins == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_times_only_server_round_trip():
+    """Очередь limiter не попадает в задержку хеджа."""
+
+    async def handler(request):
+        await asyncio.sleep(0.02)
+        return web.json_response({"ok": True})
+
+    hedge = HedgePolicy(min_samples=1, max_ratio=1)
+    limiter = StaticLimiter(1)
+    app = web.Application()
+    app.router.add_get("/api", handler)
+    loop = asyncio.get_running_loop()
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        async with APIClient(base_url, limiter=limiter, hedge=hedge) as client:
+            began = loop.time()
+            await asyncio.gather(
+                *(client.request("GET", "/api") for _ in range(8))
+            )
+            elapsed = loop.time() - began
+
+    assert elapsed >= 8 * 0.02
+    assert hedge.stats().delay < elapsed / 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_hedge_budget_caps_duplicates():
+    """Доля дубликатов не превышает max_ratio."""
+    hedge = HedgePolicy(min_samples=1, max_ratio=0.1)
+    hedge.observe(0.001)
+
+    async def slow():
+        await asyncio.sleep(0.01)
+        return "ok"
+
+    for _ in range(30):
+        assert await hedge.run(slow) == "ok"
+    assert 1 <= hedge.stats().hedges <= 3
+
+
+@pytest.mark.asyncio
+async def test_api_client_lean_decode():
+    """Запрашивается только title, тело разбирается переданным загрузчиком."""
+    seen = []
+
+    async def handler(request):
+        seen.append(request.query.get("cmprop"))
+        return web.json_response({"query": {"categorymembers": []}})
+
+    def loads(body: bytes):
+        assert isinstance(body, bytes)
+        return {"decoded": len(body)}
+
+    app = web.Application()
+    app.router.add_get("/w/api.php", handler)
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        async with APIClient(base_url, json_loads=loads) as client:
+            pages = crawl(client, "cat", [Partition(None, None)], Semaphore(1))
+            with pytest.raises(StopAsyncIteration):
+                await pages.__anext__()  # ответ без query отбрасывается
+    assert seen == ["title"]
+
+
+@pytest.mark.asyncio
+async def test_job_runner_shares_and_dedups_categories():
+    """Общие подкатегории загружаются один раз, статьи не дублируются."""
+    tree = {
+        "Категория:Звери": ["Барсук", "Категория:Кошачьи", "Категория:Псовые"],
+        "Категория:Кошачьи": ["Лев", "Рысь", "Категория:Большие кошки"],
+        "Категория:Псовые": ["Волк", "Лиса", "Лев", "Категория:Кошачьи"],
+        "Категория:Большие кошки": ["Лев", "Тигр"],
+        "Категория:Хищники": ["Волк", "Категория:Кошачьи"],
+    }
+    client = MockAPIClient(members=tree, page_size=2)
+    runner = JobRunner(client, Semaphore(4), key=normalize_first_char)
+    specs = [
+        CategorySpec("Категория:Звери", depth=2, members=True),
+        CategorySpec("Категория:Хищники", depth=1),
+        CategorySpec("Категория:Кошачьи"),
+    ]
+
+    results = {r.spec.title: r async for r in runner.run(specs)}
+
+    zveri = results["Категория:Звери"]
+    assert zveri.members == ["Барсук", "Волк", "Лев", "Лиса", "Рысь", "Тигр"]
+    assert zveri.categories == 4
+    assert zveri.counts == {"Б": 1, "В": 1, "Л": 2, "Р": 1, "Т": 1}
+    assert results["Категория:Хищники"].total == 3  # Волк, Лев, Рысь
+    assert results["Категория:Кошачьи"].members is None
+
+    page_requests = Counter(
+        r["cmtitle"] for r in client.requests if r["cmtype"] == "page|redirect"
+    )
+    # каждая категория загружена один раз: ceil(статей / page_size) страниц
+    assert page_requests == {
+        "Категория:Звери": 1,
+        "Категория:Кошачьи": 1,
+        "Категория:Псовые": 2,
+        "Категория:Большие кошки": 1,
+        "Категория:Хищники": 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_job_runner_reports_failed_spec():
+    """Упавшее задание возвращается с ошибкой, остальные доходят до конца."""
+    tree = {
+        "Категория:Звери": ["Барсук", "Категория:Сломанная"],
+        "Категория:Сломанная": ["Ёж"],
+        "Категория:Псовые": ["Волк", "Лиса"],
+    }
+
+    class BrokenCategoryClient(MockAPIClient):
+        broken = True
+
+        async def request(self, method, url, params, use_cache=True):
+            if self.broken and params["cmtitle"] == "Категория:Сломанная":
+                raise RuntimeError("upstream down")
+            return await super().request(method, url, params, use_cache)
+
+    client = BrokenCategoryClient(members=tree)
+    runner = JobRunner(client, Semaphore(4))
+    specs = [
+        CategorySpec("Категория:Звери", depth=1),
+        CategorySpec("Категория:Псовые"),
+        CategorySpec("Категория:Сломанная"),
+    ]
+
+    results = {r.spec.title: r async for r in runner.run(specs)}
+
+    assert results["Категория:Псовые"].total == 2
+    assert results["Категория:Псовые"].error is None
+    assert "upstream down" in results["Категория:Звери"].error
+    assert "upstream down" in results["Категория:Сломанная"].error
+    # загрузки не переживают задания, которым они были нужны
+    assert not runner._pages and not runner._subcategories
+
+    client.broken = False
+    (retried,) = [r async for r in runner.run(specs[2:])]
+    assert (retried.total, retried.error) == (1, None)
+
+
+@pytest.mark.asyncio
+async def test_jobs_main_shares_cache(tmp_path):
+    """jobs.main пишет результат построчно и открывает общий кеш."""
+    output, cache_path = tmp_path / "out.jsonl", tmp_path / "cache.sqlite"
+    with patch("wiki.APIClient", MockAPIClient):
+        await run_jobs(
+            [CategorySpec("Категория:Звери")],
+            str(output),
+            cache_path=str(cache_path),
+        )
+    (record,) = map(json.loads, output.read_text(encoding="utf-8").splitlines())
+    assert record["total"] == len(DEFAULT_MEMBERS)
+    assert cache_path.exists()
+
+
+@pytest.mark.asyncio
+async def test_incremental_recount_applies_deltas(tmp_path):
+    """
+    Пересчёт читает только изменения с водяного знака, полный — по нужде;
+    изменения и отметка не берутся из кеша клиента.
+    """
+    category = "Категория:Звери"
+    changes = {
+        None: (
+            [
+                {"rcid": 10, "comment": "[[:Барсук]] added to category"},
+                {"rcid": 11, "comment": "[[:Лев]] добавлена в категорию"},
+                {"rcid": 12, "comment": "[[:Ёж]] added to category"},
+            ],
+            "12|12",
+        ),
+        "12|12": (
+            [
+                {"rcid": 13, "comment": "[[:Барсук]] удалена из категории"},
+                {
+                    "rcid": 14,
+                    "comment": "[[:Категория:Кошачьи]] added to category",
+                },
+            ],
+            None,
+        ),
+    }
+    seen = []
+    latest_rcid = [10]
+    namespaces = {
+        "0": {"id": 0, "*": ""},
+        "14": {"id": 14, "canonical": "Category", "*": "Категория"},
+    }
+
+    async def handler(request):
+        query = request.query
+        if query.get("meta") == "siteinfo":
+            return web.json_response(
+                {"query": {"namespaces": namespaces, "namespacealiases": []}}
+            )
+        seen.append((query["rcdir"], query.get("rcstart")))
+        if query["rcdir"] == "older":
+            return web.json_response(
+                {
+                    "curtimestamp": "2025-05-29T00:00:00Z",
+                    "query": {"recentchanges": [{"rcid": latest_rcid[0]}]},
+                }
+            )
+        events, next_token = changes[query.get("rccontinue")]
+        return web.json_response(
+            {
+                "curtimestamp": "2025-06-01T00:00:00Z",
+                "query": {"recentchanges": events},
+                "continue": {"rccontinue": next_token},
+            }
+        )
+
+    full_counts = []
+
+    async def full_count():
+        full_counts.append(1)
+        latest_rcid[0] = 11  # событие 11 пришло во время обхода
+        return {"Б": 5, "Л": 2}
+
+    path = str(tmp_path / "counts.json")
+    now = lambda: datetime(2025, 6, 1, tzinfo=timezone.utc)  # noqa: E731
+    app = web.Application()
+    app.router.add_get("/w/api.php", handler)
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        async with APIClient(base_url, cache=ResponseCache()) as client:
+
+            async def run(**kwargs):
+                return await recount(
+                    client,
+                    category,
+                    path,
+                    full_count,
+                    normalize_first_char,
+                    Semaphore(1),
+                    now=now,
+                    **kwargs,
+                )
+
+            assert await run() == {"Б": 5, "Л": 2}
+            # отметка берётся после обхода, а не до него
+            assert incremental_state(path).last_rcid == 11
+
+            # rcid 10 и 11 уже учтены полным обходом, подкатегория не статья.
+            assert await run() == {"Б": 4, "Л": 2, "Е": 1}
+            state = incremental_state(path)
+            assert (state.watermark, state.last_rcid) == (
+                "2025-06-01T00:00:00Z",
+                14,
+            )
+            assert seen[-2:] == [("newer", "2025-05-29T00:00:00Z")] * 2
+
+            changes[None] = (
+                [{"rcid": 15, "comment": "[[:Волк]] и ещё 2"}],
+                None,
+            )
+            assert await run() == {"Б": 5, "Л": 2}
+            assert await run(full=True) == {"Б": 5, "Л": 2}
+            # Тот же водяной знак, что и во втором запуске, но новые события.
+            assert incremental_state(path).watermark == "2025-05-29T00:00:00Z"
+            assert await run() == {"Б": 5, "Л": 2}
+    assert len(full_counts) == 4
+    assert [rcdir for rcdir, _ in seen].count("older") == 4
+    assert len(seen) == 8
+
+
+@pytest.mark.asyncio
+async def test_metrics_run_report():
+    """Отчёт собирает задержки, байты, повторы, паузы и страницы."""
+    replies = [
+        web.Response(status=503, text="busy"),
+        web.json_response(
+            {"query": {"categorymembers": [{"title": "Лев"}, {"title": "Ёж"}]}}
+        ),
+    ]
+    seen = []
+
+    async def handler(request):
+        seen.append(request)
+        return replies[len(seen) - 1]
+
+    metrics = Metrics()
+    app = web.Application()
+    app.router.add_get("/w/api.php", handler)
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        async with APIClient(
+            base_url,
+            metrics=metrics,
+            rate_limiter=TokenBucket(100),
+            limiter=AIMDLimiter(),
+            breaker=CircuitBreaker(wait=True),
+        ) as client:
+            pages = [
+                page
+                async for page in crawl(
+                    client, "cat", [Partition(None, "Б")], Semaphore(1)
+                )
+            ]
+    assert len(pages) == 1
+
+    report = metrics.report(extra=1)
+    requests = report["requests"]["/w/api.php:categorymembers"]
+    assert requests["statuses"] == {"503": 1, "200": 1}
+    assert requests["latency"]["count"] == 2
+    assert requests["bytes"] == report["bytes"] > len("busy")
+    assert report["retries"] == {"ServerError": 1}
+    assert report["backoff_sleep"] > 0
+    assert report["semaphore_wait"]["count"] == 1
+    # каждая из двух попыток ждала токен, слот и разрешение breaker
+    assert {kind: wait["count"] for kind, wait in report["waits"].items()} == {
+        "rate_limiter": 2,
+        "limiter": 2,
+        "breaker": 2,
+    }
+    assert report["partitions"] == {"cat:..Б": {"pages": 1, "members": 2}}
+    assert report["extra"] == 1
+
+    histogram = Histogram(buckets=(1.0, 2.0))
+    for value in (0.5, 1.5, 1.5, 7.0):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1]
+    assert (histogram.quantile(0.5), histogram.quantile(0.99)) == (2.0, 7.0)
+
+
+@pytest.mark.asyncio
+async def test_metrics_time_parked_breaker():
+    """Ожидание разомкнутой цепи попадает в гистограмму breaker."""
+    metrics = Metrics()
+    breaker = CircuitBreaker(
+        failure_threshold=1, recovery_timeout=0.05, wait=True
+    )
+    breaker.record_failure()
+
+    @backoff(breaker=breaker, metrics=metrics)
+    async def probe():
+        return "ok"
+
+    assert await probe() == "ok"
+    assert metrics.report()["waits"]["breaker"]["max"] >= 0.04
+
+
+def test_synthetic_category_order():
+    """Синтетическая категория упорядочена как настоящая и ищется по префиксу."""
+    category = SyntheticCategory(1000)
+    keys = [sortkey(title) for title in category]
+    assert keys == sorted(keys)
+    start = category.find("Б")
+    assert category[start].startswith("Б") and category[start - 1][0] == "А"
+    assert sum(category.counts().values()) == 1000
+    assert category.counts()["#"] == 20
+
+
+@pytest.mark.asyncio
+async def test_fake_wiki_with_faults():
+    """Настоящий клиент обходит локальный сервер сквозь ошибки и 429."""
+    category = SyntheticCategory(3000)
+    wiki = FakeWiki(
+        category, FaultConfig(error_rate=0.05, throttle_rate=0.05), seed=1
+    )
+    metrics = Metrics()
+    async with TestServer(wiki.app()) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        async with APIClient(base_url, metrics=metrics) as client:
+            counts = await count_animals(client, Semaphore(8))
+    assert counts == category.counts()
+    statuses = metrics.statuses["/w/api.php:categorymembers"]
+    assert statuses["503"] and statuses["429"]
+    assert sum(metrics.retries.values()) == wiki.requests - statuses["200"]
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_identical_gets():
+    """Одинаковые GET в полёте — один HTTP-вызов; ошибка доходит до всех."""
+    gate = asyncio.Event()
+    hits = Counter()
+
+    async def handler(request):
+        hits[request.query["q"]] += 1
+        await gate.wait()
+        if request.query["q"] == "bad":
+            return web.Response(status=404, text="missing")
+        return web.json_response({"q": request.query["q"]})
+
+    flight = SingleFlight()
+    app = web.Application()
+    app.router.add_get("/api", handler)
+    async with TestServer(app) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        async with APIClient(base_url, single_flight=flight) as client:
+
+            def get(q):
+                return asyncio.ensure_future(
+                    client.request("GET", "/api", params={"q": q})
+                )
+
+            good = [get("ok") for _ in range(4)]
+            bad = [get("bad") for _ in range(2)]
+            other = get("other")
+            await asyncio.sleep(0.05)
+            good[0].cancel()  # уход одного ожидающего не отменяет запрос
+            gate.set()
+            results = await asyncio.gather(*good[1:], other)
+            errors = await asyncio.gather(*bad, return_exceptions=True)
+
+    assert results[0] is results[1] is results[2] == {"q": "ok"}
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert hits == {"ok": 1, "bad": 1, "other": 1}
+    assert flight.stats() == (7, 3, 4, 0)
+
+
+@pytest.mark.asyncio
+async def test_sharded_count_matches_single_process():
+    """Шарды в отдельных процессах дают тот же итог, метрики сводятся."""
+    partitions = make_partitions("БВГЖЯ")
+    assert [len(s) for s in split(partitions, 4)] == [2, 2, 1, 1]
+    assert sum(split(partitions, 4), []) == partitions
+
+    category = SyntheticCategory(600)
+    metrics = Metrics()
+    async with TestServer(FakeWiki(category).app()) as server:
+        base_url = str(server.make_url("")).rstrip("/")
+        counts = await count_sharded(
+            "cat",
+            partitions,
+            normalize_first_char,
+            partial(APIClient, base_url),
+            workers=3,
+            concurrency=2,
+            metrics=metrics,
+        )
+    assert counts == category.counts()
+    assert list(counts) == sorted(counts)
+    assert sum(metrics.members.values()) == len(category)
+    assert (
+        sum(metrics.pages.values())
+        == metrics.latency["/w/api.php:categorymembers"].count
+        == len(partitions)
+    )
+    assert len(metrics.clients) == 3
+    stats = merge_client_stats(metrics.clients)
+    assert stats["pool"]["limit_per_host"] == 3 * PoolConfig().limit_per_host
+    assert stats["pool"]["new_connections"] > 0
+
+
+def test_worker_client_options_split_limits():
+    """Частота, предел AIMD и соединения на хост делятся между шардами."""
+    options = worker_client_options(
+        {"rate": None, "config": PoolConfig(limit_per_host=0)}, 4
+    )
+    assert options["rate"] is None
+    assert options["config"].limit_per_host == 0
+    assert options["max_concurrency"] == 8
+
+    options = worker_client_options(None, 4)
+    assert options["rate"] == 12.5
+    assert options["config"].limit_per_host == 8
+    client = make_client(**options)
+    assert client.limiter.max_limit == 8
+    assert client.limiter.limit <= 8
+    assert worker_client_options(None, 64)["max_concurrency"] == 1
+
+    pool = {"limit_per_host": 8, "peak_in_flight": 3}
+    merged = merge_client_stats(
+        [
+            {"pool": pool, "hedge": {"hedges": 1, "delay": None}},
+            {"pool": pool, "hedge": {"hedges": 2, "delay": 0.2}},
+            {"pool": pool, "hedge": {"hedges": 0, "delay": 0.1}},
+        ]
+    )
+    assert merged == {
+        "pool": {"limit_per_host": 24, "peak_in_flight": 9},
+        "hedge": {"hedges": 3, "delay": 0.2},
+    }
+
+
+def test_sinks_batch_and_replace_atomically(tmp_path):
+    """Пачки пишутся во .part, итог появляется только после commit."""
+    rows = [(f"Зверь «{i}»", "З", i) for i in range(10)]
+    columns = ("title", "letter", "n")
+
+    csv_path = tmp_path / "members.csv"
+    sink = open_sink(str(csv_path), columns, batch_size=4)
+    sink.write(rows[:5])
+    sink.write(rows[5:])
+    assert sink.rows == 8 and not csv_path.exists()
+    sink.commit()
+    assert not (tmp_path / "members.csv.part").exists()
+    with open(csv_path, encoding="utf-8-sig") as file:
+        assert list(csv.reader(file))[1:] == [list(map(str, r)) for r in rows]
+
+    bcol_path = tmp_path / "members.bcol"
+    with open_sink(
+        str(bcol_path), columns, batch_size=3, types=(STR, STR, INT)
+    ) as sink:
+        sink.write(rows)
+    assert read_columnar(str(bcol_path)) == dict(
+        zip(columns, map(list, zip(*rows)))
+    )
+
+    class NoBatches(Sink):
+        def _open(self, path):
+            return open(path, "w")
+
+    with pytest.raises(TypeError, match="_write_batch"):
+        NoBatches(str(tmp_path / "members.txt"), columns)
+    assert not (tmp_path / "members.txt.part").exists()
+
+    jsonl_path = tmp_path / "members.jsonl"
+    with pytest.raises(RuntimeError):
+        with open_sink(str(jsonl_path), columns, batch_size=4) as sink:
+            sink.write(rows[:6])
+            raise RuntimeError("crawl failed")
+    assert not jsonl_path.exists()
+    part = (tmp_path / "members.jsonl.part").read_text(encoding="utf-8")
+    assert [json.loads(line)["n"] for line in part.splitlines()] == list(
+        range(6)
+    )
+
+
+@pytest.mark.asyncio
+async def test_main_streams_members(tmp_path):
+    """main выгружает участников вместе с подсчётом."""
+    members_path = tmp_path / "members.jsonl"
+    with patch("wiki.APIClient", MockAPIClient):
+        from solution import main
+
+        await main(
+            csv_path=str(tmp_path / "beasts.csv"),
+            members_path=str(members_path),
+        )
+    lines = members_path.read_text(encoding="utf-8").splitlines()
+    records = sorted(map(json.loads, lines), key=lambda r: r["title"])
+    assert [(r["title"], r["letter"]) for r in records] == sorted(
+        (title, normalize_first_char(title)) for title in DEFAULT_MEMBERS
+    )
@@ -0,0 +1,116 @@
+"""
+Общие настройки обхода Википедии: клиент со всеми ограничителями
+нагрузки и алфавит подсчёта по первой букве. Используются solution.py,
+jobs.py и вспомогательными скриптами.
+"""
+
+import logging
+import re
+
+from api_client import APIClient, PoolConfig
+from hedging import HedgePolicy
+from http_cache import ResponseCache
+from limiter import AIMDLimiter
+from metrics import Metrics
+from my_backoff import CircuitBreaker, TokenBucket
+from singleflight import SingleFlight
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    handlers=[logging.StreamHandler()],
+)
+logger = logging.getLogger("wiki")
+
+BASE_URL = "https://ru.wikipedia.org"
+# Потолок параллелизма; рабочее значение подбирает AIMDLimiter.
+MAX_CONCURRENT_REQUESTS = 32
+INITIAL_CONCURRENT_REQUESTS = 4
+MAX_REQUESTS_PER_SECOND = 50
+# Рекомендация MediaWiki: не нагружать API при отставании реплик > 5 с.
+MAXLAG = 5
+# Сколько ошибок подряд размыкают цепь и на сколько секунд.
+BREAKER_THRESHOLD = 10
+BREAKER_RECOVERY = 30.0
+
+# без "Ё", '#' - аггрегирует спецсимволы и все не начинается с кириллицы.
+# alphabet = "#АБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЭЮЯ"
+ALPHABET = "#" + "".join(map(chr, range(ord("А"), ord("Я") + 1)))
+
+# Кириллическая буква (любого регистра) -> буква алфавита подсчёта.
+_LETTERS = {
+    char: "Е" if char in "Ёё" else char.upper()
+    for char in ALPHABET[1:] + ALPHABET[1:].lower() + "Ёё"
+}
+_FIRST_LETTER = re.compile("[" + "".join(_LETTERS) + "]")
+
+
+def normalize_first_char(title: str) -> str:
+    """
+    Нормализует первую букву названия
+
+    Обычно название начинается с буквы — это один поиск в словаре; иначе
+    первая кириллическая буква ищется заранее скомпилированным
+    выражением, без копирования хвоста строки.
+    """
+    letter = _LETTERS.get(title[:1])
+    if letter is not None:
+        return letter
+    match = _FIRST_LETTER.search(title)
+    return "#" if match is None else _LETTERS[match.group()]
+
+
+def sortkey(title: str) -> tuple[int, str]:
+    """
+    Упрощённая модель сортировки категории (uca-ru): некириллические
+    заголовки идут раньше кириллических, Ё сортируется вместе с Е.
+    """
+    key = title.upper().replace("Ё", "Е")
+    is_cyrillic = bool(key) and "А" <= key[0] <= "Я"
+    return (1 if is_cyrillic else 0, key)
+
+
+def make_client(
+    cache: ResponseCache | None = None,
+    hedge: bool = False,
+    metrics: Metrics | None = None,
+    base_url: str = BASE_URL,
+    config: PoolConfig = PoolConfig(limit_per_host=MAX_CONCURRENT_REQUESTS),
+    rate: float | None = MAX_REQUESTS_PER_SECOND,
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+) -> APIClient:
+    """
+    Клиент Википедии со всеми ограничителями нагрузки.
+
+    base_url, config и rate (None — без ограничения частоты) меняются
+    для прогонов против локального сервера (см. bench_server.py);
+    max_concurrency — верхний предел AIMD-лимитера (для процессов-шардов
+    он делится между ними).
+    """
+    return APIClient(
+        base_url,
+        config,
+        cache=cache,
+        limiter=AIMDLimiter(
+            initial=min(INITIAL_CONCURRENT_REQUESTS, max_concurrency),
+            max_limit=max_concurrency,
+        ),
+        rate_limiter=TokenBucket(rate) if rate else None,
+        maxlag=MAXLAG,
+        breaker=CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RECOVERY, wait=True),
+        hedge=HedgePolicy() if hedge else None,
+        metrics=metrics,
+        single_flight=SingleFlight(),
+    )
+
+
+def log_client_stats(client: APIClient) -> None:
+    logger.info(f"Пул соединений: {client.pool_stats()}")
+    if client.limiter is not None:
+        logger.info(f"Параллелизм: {client.limiter.stats()}")
+    if client.hedge is not None:
+        logger.info(f"Хеджирование: {client.hedge.stats()}")
+    if client.single_flight is not None:
+        logger.info(f"Объединение запросов: {client.single_flight.stats()}")
+    if client.cache is not None:
+        logger.info(f"Кеш ответов: {client.cache.stats()}")